@@ -1,10 +1,50 @@
-from fastapi import FastAPI
-from app.routers import highlight_router
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from app.routers import highlight_router, jobs_router, metrics_router
+from app.services import metrics
+from app.services.job_service import job_runner
+from app.services.summarizer_service import prepare_model
+
+# 0 = model baru dimuat saat request pertama (mis. untuk tes / tooling)
+PRELOAD_MODEL = os.getenv("HIGHLIGHT_PRELOAD_MODEL", "1") != "0"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Muat model + warmup di background: /health langsung hidup,
+    # /ready menunggu sampai model siap menerima trafik
+    if PRELOAD_MODEL:
+        threading.Thread(target=prepare_model, name="model-loader", daemon=True).start()
+    # Job yang belum selesai sebelum restart langsung dilanjutkan
+    job_runner.start()
+    yield
+    job_runner.stop()
 
 app = FastAPI(
     title="Law News Highlight API",
     description="API untuk menghasilkan highlight berita hukum online.",
-    version="0.3.0"
+    version="0.3.0",
+    lifespan=lifespan
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label pakai template route (mis. /highlight), bukan URL mentah
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.REQUESTS.inc(path=path, status=str(status))
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, path=path)
+
 app.include_router(highlight_router)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
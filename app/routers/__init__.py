@@ -1,3 +1,5 @@
 from .highlight_router import router as highlight_router
+from .jobs_router import router as jobs_router
+from .metrics_router import router as metrics_router
 
-__all__ = ["highlight_router"]
+__all__ = ["highlight_router", "jobs_router", "metrics_router"]
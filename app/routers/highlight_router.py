@@ -1,22 +1,261 @@
-from fastapi import APIRouter
+import asyncio
+import json
+import time
+from concurrent.futures import Future
+from typing import Optional
 
-from app.schemas import HighlightRequest, HighlightResponse
-from app.services.summarizer_service import generate_highlight_from_text
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.schemas import (
+    HighlightBatchRequest,
+    HighlightBatchResponse,
+    HighlightBatchResult,
+    HighlightRequest,
+    HighlightResponse,
+)
+from app.services.cache_service import encoder_cache, highlight_cache
+from app.services.dedup_service import highlight_dedup
+from app.services import metrics
+from app.services.metrics import server_timing_header
+from app.services.summarizer_service import (
+    DeadlineExceeded,
+    InferenceQueueFull,
+    LONG_DOC_CHUNK_TOKENS,
+    LONG_DOC_MAX_CHUNKS,
+    LONG_DOC_OVERLAP,
+    batcher,
+    draft_registry,
+    generate_highlights_batch,
+    generate_long_highlight,
+    model_pool,
+    model_registry,
+    resolve_deadline,
+    stream_highlight_from_text,
+)
 
 router = APIRouter()
 
+# Waktu tambahan di atas deadline sebelum request dijawab 504, supaya
+# generate yang dihentikan stopping criteria sempat mengirim hasil parsial
+DEADLINE_GRACE_SECONDS = 1.0
+
+TIMEOUTS = metrics.registry.counter(
+    "highlight_deadline_exceeded_total", "Request yang melewati deadline (partial / timeout)"
+)
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def queue_full_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server sedang penuh, coba lagi nanti.",
+        headers={"Retry-After": "1"}
+    )
+
+def resolve_model(name: Optional[str]) -> str:
+    if name is not None and name not in model_pool.names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model tidak dikenal: {name}. Pilihan: {', '.join(model_pool.names)}"
+        )
+    return name or model_pool.default
+
+def check_decoding(decoding: Optional[str]) -> Optional[str]:
+    if decoding == "assisted" and draft_registry is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Mode assisted butuh draft model; set HIGHLIGHT_DRAFT_MODEL di server."
+        )
+    return decoding
+
+def timeout_error() -> HTTPException:
+    TIMEOUTS.inc(result="timeout")
+    return HTTPException(status_code=504, detail="Batas waktu request terlampaui.")
+
+async def wait_result(future: Future, deadline: Optional[float]):
+    """
+    Menunggu hasil worker paling lama sampai deadline (+ grace). Jika
+    habis selagi masih antre, job dibatalkan sebelum sempat generate.
+    """
+    waiter = asyncio.wrap_future(future)
+    if deadline is None:
+        return await waiter
+    try:
+        return await asyncio.wait_for(waiter, timeout=deadline - time.monotonic() + DEADLINE_GRACE_SECONDS)
+    except DeadlineExceeded:
+        # DeadlineExceeded juga turunan TimeoutError; hasil parsial dari worker diteruskan
+        raise
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded()
+
 @router.get("/health")
 async def health_check():
     return {"status": "ok", "message": "API is running"}
 
+@router.get("/ready")
+async def readiness_check():
+    if model_registry.ready:
+        return {"status": "ready", "load_seconds": model_registry.load_seconds}
+    if model_registry.error:
+        return JSONResponse(status_code=503, content={"status": "error", "message": model_registry.error})
+    return JSONResponse(status_code=503, content={"status": "loading", "message": "Model sedang dimuat"})
+
+@router.get("/models")
+async def list_models():
+    return {"default": model_pool.default, "models": model_pool.status()}
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return {
+        **highlight_cache.stats(),
+        "near_duplicates": highlight_dedup.stats(),
+        "encoder": encoder_cache.stats(),
+    }
+
 @router.post("/highlight", response_model=HighlightResponse)
-async def highlight_endpoint(request: HighlightRequest):
-        
-    highlight = generate_highlight_from_text(
-        content=request.content,
-        max_length=request.max_length,
-        min_length=request.min_length,
-        no_repeat_ngram_size=request.no_repeat_ngram_size
-    )
+async def highlight_endpoint(
+    request: HighlightRequest,
+    response: Response,
+    x_request_timeout: Optional[float] = Header(None, gt=0)
+):
+
+    model_name = resolve_model(request.model)
+    decoding = check_decoding(request.decoding)
+    deadline = resolve_deadline(request.timeout or x_request_timeout)
+    # Durasi per tahap, dikembalikan ke client lewat header Server-Timing
+    timings = {}
+    try:
+        if request.long_document:
+            future = batcher.submit_call(
+                generate_long_highlight,
+                content=request.content,
+                max_length=request.max_length,
+                min_length=request.min_length,
+                no_repeat_ngram_size=request.no_repeat_ngram_size,
+                chunk_tokens=request.chunk_tokens or LONG_DOC_CHUNK_TOKENS,
+                chunk_overlap=request.chunk_overlap if request.chunk_overlap is not None else LONG_DOC_OVERLAP,
+                max_chunks=request.max_chunks or LONG_DOC_MAX_CHUNKS,
+                timings=timings,
+                model_name=model_name,
+                deadline=deadline,
+                decoding=decoding
+            )
+        else:
+            # Preprocess & tokenisasi juga di luar event loop
+            future = await run_in_threadpool(
+                batcher.submit,
+                content=request.content,
+                max_length=request.max_length,
+                min_length=request.min_length,
+                no_repeat_ngram_size=request.no_repeat_ngram_size,
+                timings=timings,
+                model_name=model_name,
+                deadline=deadline,
+                decoding=decoding
+            )
+    except InferenceQueueFull:
+        raise queue_full_error()
+
+    timed_out = False
+    try:
+        highlight = await wait_result(future, deadline)
+    except DeadlineExceeded as e:
+        if not e.partial:
+            raise timeout_error()
+        TIMEOUTS.inc(result="partial")
+        highlight, timed_out = e.partial, True
+
+    if timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return HighlightResponse(highlight=highlight, timed_out=timed_out)
+
+@router.post("/highlight/batch", response_model=HighlightBatchResponse)
+async def highlight_batch_endpoint(
+    request: HighlightBatchRequest,
+    x_request_timeout: Optional[float] = Header(None, gt=0)
+):
+
+    # Model batch yang tidak dikenal = 400; model per item hanya menggagalkan item itu
+    default_model = resolve_model(request.model)
+    decoding = check_decoding(request.decoding)
+
+    results = [HighlightBatchResult(index=i) for i in range(len(request.items))]
+    items, positions = [], []
+    for i, item in enumerate(request.items):
+        if item.model is not None and item.model not in model_pool.names:
+            results[i].error = f"Model tidak dikenal: {item.model}"
+            continue
+        items.append((
+            item.content,
+            item.max_length if item.max_length is not None else request.max_length,
+            item.min_length if item.min_length is not None else request.min_length,
+            item.no_repeat_ngram_size if item.no_repeat_ngram_size is not None else request.no_repeat_ngram_size,
+            item.model or default_model,
+        ))
+        positions.append(i)
+
+    if items:
+        deadline = resolve_deadline(request.timeout or x_request_timeout)
+        try:
+            future = batcher.submit_call(generate_highlights_batch, items, deadline=deadline, decoding=decoding)
+        except InferenceQueueFull:
+            raise queue_full_error()
+        try:
+            outputs = await wait_result(future, deadline)
+        except DeadlineExceeded:
+            raise timeout_error()
+        for i, (highlight, error) in zip(positions, outputs):
+            results[i].highlight, results[i].error = highlight, error
+
+    return HighlightBatchResponse(results=results)
+
+@router.post("/highlight/stream")
+async def highlight_stream_endpoint(
+    request: HighlightRequest,
+    x_request_timeout: Optional[float] = Header(None, gt=0)
+):
+
+    # Potongan teks dari thread generate diteruskan ke event loop lewat antrean
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    try:
+        future = batcher.submit_call(
+            stream_highlight_from_text,
+            content=request.content,
+            on_text=lambda text: loop.call_soon_threadsafe(chunks.put_nowait, text),
+            max_length=request.max_length,
+            min_length=request.min_length,
+            no_repeat_ngram_size=request.no_repeat_ngram_size,
+            model_name=resolve_model(request.model),
+            deadline=resolve_deadline(request.timeout or x_request_timeout),
+            decoding=check_decoding(request.decoding)
+        )
+    except InferenceQueueFull:
+        raise queue_full_error()
+
+    async def events():
+        done = asyncio.wrap_future(future)
+        while True:
+            next_chunk = asyncio.ensure_future(chunks.get())
+            finished, _ = await asyncio.wait({next_chunk, done}, return_when=asyncio.FIRST_COMPLETED)
+            if next_chunk not in finished:
+                next_chunk.cancel()
+                break
+            yield sse_event("token", {"text": next_chunk.result()})
+
+        while not chunks.empty():
+            yield sse_event("token", {"text": chunks.get_nowait()})
+
+        try:
+            yield sse_event("highlight", {"highlight": done.result()})
+        except DeadlineExceeded as e:
+            TIMEOUTS.inc(result="partial" if e.partial else "timeout")
+            yield sse_event("timeout", {"highlight": e.partial, "detail": str(e)})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
 
-    return HighlightResponse(highlight=highlight)
\ No newline at end of file
+    return StreamingResponse(events(), media_type="text/event-stream")
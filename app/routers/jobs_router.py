@@ -0,0 +1,132 @@
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.routers.highlight_router import check_decoding, resolve_model
+from app.schemas import MAX_NEW_TOKENS, Decoding, JobItem, JobResponse
+from app.services.job_service import JOB_MAX_ITEMS, JobNotFound, job_runner, job_store
+
+router = APIRouter()
+
+# Baris JSONL yang disimpan per transaksi saat upload
+UPLOAD_CHUNK_ITEMS = 1000
+
+def job_not_found(job_id: str) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"Job tidak ditemukan: {job_id}")
+
+async def iter_jsonl(request: Request):
+    """
+    Baris JSONL dari body request, dibaca bertahap tanpa menampung
+    seluruh body di memori
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+def parse_item(line: bytes, lineno: int, params: dict) -> Optional[dict]:
+    if not line.strip():
+        return None
+    try:
+        item = JobItem.model_validate_json(line)
+    except ValidationError as e:
+        errors = json.loads(e.json(include_url=False, include_context=False))
+        raise HTTPException(status_code=422, detail={"line": lineno, "errors": errors})
+    max_length = item.max_length if item.max_length is not None else params["max_length"]
+    min_length = item.min_length if item.min_length is not None else params["min_length"]
+    if min_length > max_length:
+        raise HTTPException(status_code=422, detail={
+            "line": lineno, "errors": [{"msg": "min_length tidak boleh lebih besar dari max_length"}]
+        })
+    if item.model is not None:
+        resolve_model(item.model)
+    return item.model_dump()
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    request: Request,
+    response: Response,
+    max_length: int = Query(75, ge=1, le=MAX_NEW_TOKENS),
+    min_length: int = Query(30, ge=0, le=MAX_NEW_TOKENS),
+    no_repeat_ngram_size: int = Query(2, ge=0, le=10),
+    model: Optional[str] = None,
+    decoding: Optional[Decoding] = None
+):
+    """
+    Body: JSONL, satu artikel per baris ({"content": ..., "id": ...,
+    opsional max_length/min_length/no_repeat_ngram_size/model}).
+    Parameter query berlaku untuk item yang tidak menentukannya sendiri.
+    """
+    if min_length > max_length:
+        raise HTTPException(status_code=422, detail="min_length tidak boleh lebih besar dari max_length")
+    params = {
+        "max_length": max_length,
+        "min_length": min_length,
+        "no_repeat_ngram_size": no_repeat_ngram_size,
+        "model": resolve_model(model),
+        "decoding": check_decoding(decoding),
+    }
+
+    job_id = await run_in_threadpool(job_store.create, params)
+    total = 0
+    pending: List[dict] = []
+    try:
+        lineno = 0
+        async for line in iter_jsonl(request):
+            lineno += 1
+            item = parse_item(line, lineno, params)
+            if item is None:
+                continue
+            if total + len(pending) >= JOB_MAX_ITEMS:
+                raise HTTPException(status_code=413, detail=f"Maksimal {JOB_MAX_ITEMS} item per job")
+            pending.append(item)
+            if len(pending) >= UPLOAD_CHUNK_ITEMS:
+                await run_in_threadpool(job_store.add_items, job_id, total, pending)
+                total += len(pending)
+                pending = []
+        if pending:
+            await run_in_threadpool(job_store.add_items, job_id, total, pending)
+            total += len(pending)
+        if total == 0:
+            raise HTTPException(status_code=422, detail="Body JSONL tidak berisi item")
+    except BaseException:
+        # Job yang upload-nya gagal tidak ditinggalkan setengah jadi
+        await run_in_threadpool(job_store.delete, job_id)
+        raise
+
+    await run_in_threadpool(job_store.finish_upload, job_id, total)
+    job_runner.notify()
+    response.headers["Location"] = f"/jobs/{job_id}"
+    return await run_in_threadpool(job_store.get, job_id)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    try:
+        return await run_in_threadpool(job_store.get, job_id)
+    except JobNotFound:
+        raise job_not_found(job_id)
+
+@router.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, after: int = Query(-1, ge=-1)):
+    """
+    JSONL hasil item yang sudah selesai (urut index). Bisa dipanggil
+    selagi job berjalan; `after` melanjutkan dari index terakhir yang diterima.
+    """
+    try:
+        await run_in_threadpool(job_store.get, job_id)
+    except JobNotFound:
+        raise job_not_found(job_id)
+
+    def lines():
+        for result in job_store.results(job_id, after=after):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
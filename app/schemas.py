@@ -1,12 +1,100 @@
+import os
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+
+# Batas input, dicek sebelum preprocess & tokenisasi
+MAX_CONTENT_CHARS = int(os.getenv("HIGHLIGHT_MAX_CONTENT_CHARS", "100000"))
+MAX_NEW_TOKENS = int(os.getenv("HIGHLIGHT_MAX_NEW_TOKENS", "256"))
+
+# Sama dengan app.services.decoding.DECODING_MODES
+Decoding = Literal["beam", "greedy", "prompt_lookup", "assisted"]
+
+def _check_lengths(max_length: Optional[int], min_length: Optional[int]):
+    if max_length is not None and min_length is not None and min_length > max_length:
+        raise ValueError("min_length tidak boleh lebih besar dari max_length")
 
 class HighlightRequest(BaseModel):
-    content: str
-    max_length: int = 75
-    min_length: int = 30
-    no_repeat_ngram_size: int = 2
+    content: str = Field(..., max_length=MAX_CONTENT_CHARS)
+    max_length: int = Field(75, ge=1, le=MAX_NEW_TOKENS)
+    min_length: int = Field(30, ge=0, le=MAX_NEW_TOKENS)
+    no_repeat_ngram_size: int = Field(2, ge=0, le=10)
+    # Mode artikel panjang: ringkas per jendela token lalu ringkas ulang
+    long_document: bool = False
+    chunk_tokens: Optional[int] = Field(None, ge=64, le=512)
+    chunk_overlap: Optional[int] = Field(None, ge=0, le=256)
+    max_chunks: Optional[int] = Field(None, ge=1, le=32)
+    # Nama checkpoint (lihat GET /models); None = model default
+    model: Optional[str] = None
+    # Batas waktu (detik); bisa juga lewat header X-Request-Timeout
+    timeout: Optional[float] = Field(None, gt=0)
+    # None = HIGHLIGHT_DECODING; prompt_lookup/assisted = greedy yang dipercepat
+    decoding: Optional[Decoding] = None
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        _check_lengths(self.max_length, self.min_length)
+        return self
 
 
 class HighlightResponse(BaseModel):
     highlight: str
+    # True = deadline lewat saat generate, highlight hanya parsial
+    timed_out: bool = False
+
+
+class HighlightBatchItem(BaseModel):
+    content: str = Field(..., max_length=MAX_CONTENT_CHARS)
+    # None = pakai parameter bersama di HighlightBatchRequest
+    max_length: Optional[int] = Field(None, ge=1, le=MAX_NEW_TOKENS)
+    min_length: Optional[int] = Field(None, ge=0, le=MAX_NEW_TOKENS)
+    no_repeat_ngram_size: Optional[int] = Field(None, ge=0, le=10)
+    model: Optional[str] = None
+
+
+class JobItem(HighlightBatchItem):
+    # Satu baris JSONL di POST /jobs; id bebas milik client, dikembalikan di hasil
+    id: Optional[str] = Field(None, max_length=256)
+
+
+class HighlightBatchRequest(BaseModel):
+    items: List[HighlightBatchItem] = Field(..., min_length=1, max_length=256)
+    max_length: int = Field(75, ge=1, le=MAX_NEW_TOKENS)
+    min_length: int = Field(30, ge=0, le=MAX_NEW_TOKENS)
+    no_repeat_ngram_size: int = Field(2, ge=0, le=10)
+    model: Optional[str] = None
+    timeout: Optional[float] = Field(None, gt=0)
+    decoding: Optional[Decoding] = None
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        for item in self.items:
+            _check_lengths(
+                item.max_length if item.max_length is not None else self.max_length,
+                item.min_length if item.min_length is not None else self.min_length,
+            )
+        return self
+
+
+class HighlightBatchResult(BaseModel):
+    index: int
+    highlight: Optional[str] = None
+    error: Optional[str] = None
+
+
+class HighlightBatchResponse(BaseModel):
+    results: List[HighlightBatchResult]
+
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    total: int
+    done: int = 0
+    failed: int = 0
+    pending: int = 0
+    params: dict = {}
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+    finished_at: Optional[float] = None
@@ -0,0 +1,181 @@
+"""
+Serving multi-proses dengan bobot model yang dibagi antar worker.
+
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+
+Berbeda dengan `uvicorn --workers N` (setiap worker memuat model sendiri),
+proses induk memuat model sekali lalu fork N worker. Halaman memori bobot
+dibagi copy-on-write: inference hanya membaca bobot, jadi halaman itu
+tidak pernah disalin dan RSS total kira-kira satu model + overhead per
+worker. Thread torch dibagi rata antar worker supaya worker tidak saling
+berebut core.
+
+Hanya untuk Linux/macOS (butuh os.fork). Model non-default dari
+HIGHLIGHT_MODELS tetap dimuat lazy di masing-masing worker.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("app.serve")
+
+def partition_cpus(workers: int) -> List[List[int]]:
+    """
+    Membagi core yang boleh dipakai proses ini menjadi `workers` kelompok
+    yang tidak tumpang tindih (sisa core dibagi ke kelompok pertama)
+    """
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    if workers >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(workers)]
+    size, extra = divmod(len(cpus), workers)
+    groups, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(cpus[start:end])
+        start = end
+    return groups
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def load_shared_model():
+    """
+    Dijalankan di proses induk sebelum fork. Torch dibatasi satu thread
+    supaya tidak ada thread pool OpenMP yang ikut ter-fork dalam keadaan
+    setengah jalan; warmup dilakukan masing-masing worker.
+    """
+    # Tokenizer Rust memakai thread pool sendiri yang tidak aman di-fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    import torch
+
+    from app.services.summarizer_service import draft_registry, model_pool, model_registry
+
+    torch.set_num_threads(1)
+    # Jumlah thread diatur per worker setelah fork, bukan oleh load(): model
+    # lain / draft yang dimuat lazy di worker tidak boleh menimpa pembagian core
+    for name in model_pool.names:
+        model_pool.entry(name).torch_threads = 0
+    if draft_registry is not None:
+        draft_registry.torch_threads = 0
+    start = time.perf_counter()
+    model_registry.load()
+    logger.info("Model dimuat di proses induk dalam %.1f detik", time.perf_counter() - start)
+
+    # Objek yang sudah ada dipindah ke generasi permanen: GC di worker tidak
+    # lagi menulis header objek-objek ini, jadi halamannya tetap dibagi
+    gc.collect()
+    gc.freeze()
+
+def run_worker(sock: socket.socket, index: int, threads: int, cpus: Optional[List[int]], args) -> int:
+    import torch
+    import uvicorn
+
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(threads)
+
+    from app.main import app
+
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=args.timeout_keep_alive)
+    server = uvicorn.Server(config)
+    logger.info("Worker %d (pid %d) jalan dengan %d thread torch", index, os.getpid(), threads)
+    server.run(sockets=[sock])
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jalankan API dengan beberapa worker yang berbagi bobot model.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("HIGHLIGHT_SERVE_WORKERS", "2")))
+    parser.add_argument("--threads-per-worker", type=int, default=int(os.getenv("HIGHLIGHT_TORCH_THREADS", "0")),
+                        help="Thread torch per worker; 0 = core dibagi rata antar worker")
+    parser.add_argument("--pin-cpus", action="store_true",
+                        help="Kunci setiap worker ke kelompok core sendiri (sched_setaffinity)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--timeout-keep-alive", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        parser.error("Mode ini butuh os.fork (Linux/macOS); pakai uvicorn biasa di platform lain")
+    if args.workers < 1:
+        parser.error("--workers minimal 1")
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    from app.services.summarizer_service import INFERENCE_WORKERS
+
+    cpu_groups = partition_cpus(args.workers)
+    # Setiap worker punya INFERENCE_WORKERS thread generate yang berbagi thread torch-nya
+    threads = args.threads_per_worker or max(1, len(cpu_groups[0]) // INFERENCE_WORKERS)
+
+    sock = bind_socket(args.host, args.port)
+    load_shared_model()
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: sinyal kembali ke default, uvicorn memasang handler sendiri
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 1
+            try:
+                code = run_worker(sock, index, threads, cpu_groups[index] if args.pin_cpus else None, args)
+            except BaseException:
+                logger.exception("Worker %d berhenti karena error", index)
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for i in range(args.workers):
+        spawn(i)
+    logger.info("Melayani http://%s:%d dengan %d worker", args.host, args.port, args.workers)
+
+    # Worker yang mati tidak sengaja dijalankan ulang dari salinan model induk
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        if not stopping:
+            logger.warning("Worker %d (pid %d) berhenti (status %d), dijalankan ulang", index, pid, status)
+            time.sleep(1)
+            spawn(index)
+
+    sock.close()
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
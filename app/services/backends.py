@@ -0,0 +1,110 @@
+import hashlib
+import os
+import shutil
+
+# torch      : PyTorch eager fp32 (default)
+# onnx       : ONNX Runtime, encoder + decoder-with-past hasil export
+# onnx-int8  : sama seperti onnx, bobot di-quantize dinamis ke int8
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+ONNX_ENCODER = "encoder_model.onnx"
+ONNX_DECODER = "decoder_model.onnx"
+ONNX_DECODER_WITH_PAST = "decoder_with_past_model.onnx"
+# Hasil export ONNX; di luar folder checkpoint supaya tidak terbaca sebagai
+# checkpoint di models/ dan tidak mengubah model_fingerprint
+ONNX_DIR = os.getenv("HIGHLIGHT_ONNX_DIR", "onnx_cache")
+
+def _require_optimum():
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(
+            "Backend ONNX membutuhkan optimum[onnxruntime]: "
+            "pip install \"optimum[onnxruntime]\""
+        ) from e
+
+def onnx_dir_for(path: str, quantized: bool = False, root: str = ONNX_DIR) -> str:
+    """
+    Folder export per checkpoint: <root>/<nama>-<hash path absolut>/fp32|int8,
+    jadi checkpoint bernama sama di folder berbeda tidak tertukar
+    """
+    path = os.path.abspath(path)
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(root, f"{os.path.basename(path)}-{digest}", "int8" if quantized else "fp32")
+
+def export_onnx(path: str, out_dir: str) -> str:
+    """
+    Export checkpoint ke ONNX (encoder, decoder, decoder-with-past).
+    Dilewati jika hasil export sudah ada.
+    """
+    _require_optimum()
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    if not os.path.exists(os.path.join(out_dir, ONNX_ENCODER)):
+        model = ORTModelForSeq2SeqLM.from_pretrained(path, export=True)
+        model.save_pretrained(out_dir)
+    return out_dir
+
+def quantize_onnx(onnx_dir: str, out_dir: str) -> str:
+    """
+    Dynamic int8 quantization untuk setiap graph hasil export_onnx
+    """
+    _require_optimum()
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    if os.path.exists(os.path.join(out_dir, "encoder_model_quantized.onnx")):
+        return out_dir
+
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    for name in (ONNX_ENCODER, ONNX_DECODER, ONNX_DECODER_WITH_PAST):
+        quantizer = ORTQuantizer.from_pretrained(onnx_dir, file_name=name)
+        quantizer.quantize(save_dir=out_dir, quantization_config=qconfig)
+
+    generation_config = os.path.join(onnx_dir, "generation_config.json")
+    if os.path.exists(generation_config):
+        shutil.copy(generation_config, out_dir)
+    return out_dir
+
+def estimate_model_bytes(model, path: str, backend: str) -> int:
+    """
+    Perkiraan memori model: ukuran parameter + buffer (torch), atau
+    ukuran file graph ONNX yang dimuat ONNX Runtime
+    """
+    if backend == "torch":
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    onnx_dir = onnx_dir_for(path, quantized=backend == "onnx-int8")
+    return sum(
+        os.path.getsize(os.path.join(onnx_dir, name))
+        for name in os.listdir(onnx_dir)
+        if name.endswith((".onnx", ".onnx_data"))
+    )
+
+def load_seq2seq(path: str, backend: str = "torch"):
+    """
+    Memuat model seq2seq dengan method generate() untuk backend terpilih
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {backend} (pilihan: {', '.join(BACKENDS)})")
+
+    if backend == "torch":
+        from transformers import AutoModelForSeq2SeqLM
+
+        return AutoModelForSeq2SeqLM.from_pretrained(path).eval()
+
+    _require_optimum()
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    onnx_dir = export_onnx(path, onnx_dir_for(path))
+    if backend == "onnx":
+        return ORTModelForSeq2SeqLM.from_pretrained(onnx_dir)
+
+    int8_dir = quantize_onnx(onnx_dir, onnx_dir_for(path, quantized=True))
+    return ORTModelForSeq2SeqLM.from_pretrained(
+        int8_dir,
+        encoder_file_name="encoder_model_quantized.onnx",
+        decoder_file_name="decoder_model_quantized.onnx",
+        decoder_with_past_file_name="decoder_with_past_model_quantized.onnx",
+    )
@@ -0,0 +1,286 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.services import metrics
+
+# 0 entri = cache dimatikan; TTL 0 = tidak pernah kedaluwarsa
+CACHE_MAX_ENTRIES = int(os.getenv("HIGHLIGHT_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("HIGHLIGHT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("HIGHLIGHT_CACHE_TTL", "86400"))
+# Kosong = tanpa tier disk (SQLite)
+CACHE_PATH = os.getenv("HIGHLIGHT_CACHE_PATH", "")
+# Batas baris tier disk; 0 = tanpa batas (hanya TTL)
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("HIGHLIGHT_CACHE_DISK_MAX_ENTRIES", "1000000"))
+# Pembersihan tier disk dijalankan setiap sekian tulisan (dan saat start)
+DISK_PRUNE_EVERY = 1000
+# Hidden state encoder per input (backend torch); 0 = dimatikan
+ENCODER_CACHE_MAX_BYTES = int(float(os.getenv("HIGHLIGHT_ENCODER_CACHE_MB", "256")) * 1024 * 1024)
+
+def make_cache_key(text: str, model_id: str, *params) -> str:
+    """
+    Kunci berbasis isi: hash teks hasil preprocess + parameter generate
+    + identitas model
+    """
+    h = hashlib.sha256()
+    h.update(model_id.encode("utf-8"))
+    h.update(repr(params).encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+class HighlightCache:
+    """
+    LRU di memori (dibatasi jumlah entri & byte, dengan TTL) dan tier
+    SQLite opsional yang tetap ada setelah restart. Tier disk dibatasi
+    disk_max_entries; setiap DISK_PRUNE_EVERY tulisan, baris kedaluwarsa
+    dan baris paling lama dibuang. Akses disk memakai lock sendiri supaya
+    hit di memori tidak menunggu fsync.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        path: str = CACHE_PATH,
+        disk_max_entries: int = CACHE_DISK_MAX_ENTRIES
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "disk_evictions": 0
+        }
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes_since_prune = 0
+        if path and self.enabled:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS highlight_cache ("
+                "key TEXT PRIMARY KEY, highlight TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS highlight_cache_created ON highlight_cache (created_at)"
+            )
+            self._db.commit()
+            self.prune()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl > 0 and now - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                highlight, created_at, _ = entry
+                if not self._expired(created_at, now):
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return highlight
+                self._remove(key)
+                self._counters["expirations"] += 1
+
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT highlight, created_at FROM highlight_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    self._db.execute("DELETE FROM highlight_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+        with self._lock:
+            if row is not None:
+                if not self._expired(row[1], now):
+                    self._insert(key, row[0], row[1])
+                    self._counters["disk_hits"] += 1
+                    return row[0]
+                self._counters["expirations"] += 1
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, highlight: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._insert(key, highlight, now)
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO highlight_cache (key, highlight, created_at) VALUES (?, ?, ?)",
+                (key, highlight, now)
+            )
+            self._db.commit()
+            self._writes_since_prune += 1
+            due = self._writes_since_prune >= DISK_PRUNE_EVERY
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Buang baris disk yang kedaluwarsa, lalu baris paling lama sampai
+        jumlahnya <= disk_max_entries. Mengembalikan jumlah baris dibuang.
+        """
+        if self._db is None:
+            return 0
+        removed = 0
+        with self._db_lock:
+            self._writes_since_prune = 0
+            if self.ttl > 0:
+                removed += self._db.execute(
+                    "DELETE FROM highlight_cache WHERE created_at < ?", (time.time() - self.ttl,)
+                ).rowcount
+            if self.disk_max_entries > 0:
+                excess = self._db.execute("SELECT COUNT(*) FROM highlight_cache").fetchone()[0] - self.disk_max_entries
+                if excess > 0:
+                    removed += self._db.execute(
+                        "DELETE FROM highlight_cache WHERE key IN ("
+                        "SELECT key FROM highlight_cache ORDER BY created_at LIMIT ?)", (excess,)
+                    ).rowcount
+            self._db.commit()
+        if removed:
+            with self._lock:
+                self._counters["disk_evictions"] += removed
+        return removed
+
+    def _insert(self, key: str, highlight: str, created_at: float):
+        if key in self._entries:
+            self._remove(key)
+        size = len(key) + len(highlight.encode("utf-8"))
+        self._entries[key] = (highlight, created_at, size)
+        self._bytes += size
+        # Buang entri paling lama tidak dipakai sampai kembali di bawah batas
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes > 0 and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._counters["evictions"] += 1
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "disk_max_entries": self.disk_max_entries,
+            }
+
+def encoder_cache_key(model_id: str, input_ids: List[int]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(model_id.encode("utf-8"))
+    h.update(b"\0")
+    h.update(array("i", input_ids).tobytes())
+    return h.hexdigest()
+
+class EncoderCache:
+    """
+    LRU hidden state encoder (tensor [panjang_input, d_model], tanpa
+    padding) per model + input_ids, dibatasi total byte tensor. Satu
+    input 512 token bisa berukuran beberapa MB, jadi eviksi dihitung dari
+    ukuran, bukan jumlah entri.
+    """
+
+    def __init__(self, max_bytes: int = ENCODER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[object, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def set(self, key: str, hidden):
+        size = hidden.numel() * hidden.element_size()
+        # Entri yang lebih besar dari seluruh cache tidak disimpan
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (hidden, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+highlight_cache = HighlightCache()
+encoder_cache = EncoderCache()
+
+for _name in ("hits", "disk_hits", "misses", "evictions", "expirations", "disk_evictions"):
+    metrics.registry.gauge(
+        f"highlight_cache_{_name}_total",
+        f"Cache highlight: {_name}",
+        lambda n=_name: highlight_cache.stats()[n],
+        kind="counter"
+    )
+metrics.registry.gauge("highlight_cache_entries", "Jumlah entri cache highlight di memori",
+                       lambda: highlight_cache.stats()["entries"])
+metrics.registry.gauge("highlight_cache_bytes", "Ukuran cache highlight di memori (byte)",
+                       lambda: highlight_cache.stats()["bytes"])
+
+for _name in ("hits", "misses", "evictions"):
+    metrics.registry.gauge(
+        f"highlight_encoder_cache_{_name}_total",
+        f"Cache hidden state encoder: {_name}",
+        lambda n=_name: encoder_cache.stats()[n],
+        kind="counter"
+    )
+metrics.registry.gauge("highlight_encoder_cache_bytes", "Ukuran cache hidden state encoder (byte)",
+                       lambda: encoder_cache.stats()["bytes"])
@@ -0,0 +1,143 @@
+import os
+from typing import Optional
+
+# beam          : beam search bawaan pipeline summarization (default)
+# greedy        : num_beams=1
+# prompt_lookup : greedy + kandidat token disalin dari n-gram artikel sumber,
+#                 diverifikasi model dalam satu forward (hasil = greedy)
+# assisted      : greedy + kandidat dari draft model kecil (hasil = greedy)
+DECODING_MODES = ("beam", "greedy", "prompt_lookup", "assisted")
+# Mode spekulatif hanya mendukung batch berisi satu artikel
+SPECULATIVE_MODES = ("prompt_lookup", "assisted")
+
+DEFAULT_DECODING = os.getenv("HIGHLIGHT_DECODING", "beam")
+PROMPT_LOOKUP_TOKENS = int(os.getenv("HIGHLIGHT_PROMPT_LOOKUP_TOKENS", "10"))
+PROMPT_LOOKUP_NGRAM = int(os.getenv("HIGHLIGHT_PROMPT_LOOKUP_NGRAM", "3"))
+
+if DEFAULT_DECODING not in DECODING_MODES:
+    raise ValueError(f"HIGHLIGHT_DECODING tidak dikenal: {DEFAULT_DECODING} (pilihan: {', '.join(DECODING_MODES)})")
+
+def resolve_decoding(decoding: Optional[str]) -> str:
+    decoding = decoding or DEFAULT_DECODING
+    if decoding not in DECODING_MODES:
+        raise ValueError(f"Mode decoding tidak dikenal: {decoding} (pilihan: {', '.join(DECODING_MODES)})")
+    return decoding
+
+def decoding_family(decoding: str) -> str:
+    """
+    greedy, prompt_lookup dan assisted menghasilkan output yang sama,
+    jadi boleh berbagi entri cache
+    """
+    return "beam" if decoding == "beam" else "greedy"
+
+def _source_lookup_generator_class():
+    import torch
+    from transformers.generation.candidate_generator import CandidateGenerator
+
+    class SourceLookupCandidateGenerator(CandidateGenerator):
+        """
+        Seperti PromptLookupCandidateGenerator, tapi n-gram dicari di input
+        encoder (artikel), bukan di token decoder. Untuk model encoder-decoder
+        prompt lookup bawaan transformers hanya melihat ringkasan yang sedang
+        ditulis, padahal highlight sebagian besar menyalin kalimat artikel.
+        """
+
+        def __init__(self, source_ids, eos_token_id, num_output_tokens: int, max_matching_ngram_size: int,
+                     max_length: int):
+            self.source = source_ids
+            self.eos_token_id = eos_token_id
+            self.num_output_tokens = num_output_tokens
+            self.max_matching_ngram_size = max_matching_ngram_size
+            self.max_length = max_length
+
+        def get_candidates(self, input_ids):
+            cur_len = input_ids.shape[1]
+            budget = min(self.num_output_tokens, self.max_length - cur_len - 1)
+            if budget <= 0:
+                return input_ids, None
+
+            seq = input_ids[0]
+            for n in range(min(self.max_matching_ngram_size, cur_len), 0, -1):
+                if n > self.source.shape[0]:
+                    continue
+                windows = self.source.unfold(0, n, 1)
+                hits = (windows == seq[-n:]).all(dim=1).nonzero(as_tuple=True)[0]
+                for idx in hits.tolist():
+                    chosen = self.source[idx + n:idx + n + budget]
+                    # Berhenti di EOS supaya model tidak menerima token setelahnya
+                    if self.eos_token_id is not None:
+                        eos = torch.isin(chosen, self.eos_token_id).nonzero()
+                        if eos.numel() > 0:
+                            chosen = chosen[:eos[0].item()]
+                    if chosen.numel() > 0:
+                        return torch.cat((input_ids, chosen.unsqueeze(0)), dim=1), None
+            return input_ids, None
+
+        def update_candidate_strategy(self, input_ids, scores, num_matches: int):
+            return
+
+    return SourceLookupCandidateGenerator
+
+def install_candidate_generator(model):
+    """
+    Memasang hook pada GenerationMixin._get_candidate_generator (privat,
+    transformers 4.x), sekali per objek model:
+    - prompt lookup model encoder-decoder mencari n-gram di input encoder;
+    - assisted decoding tidak gagal saat min_length > 0 (AssistedCandidateGenerator
+      menolak MinLengthLogitsProcessor yang selalu ikut dari generate(), padahal
+      min_length tetap ditegakkan saat verifikasi oleh model target).
+    """
+    if getattr(model, "_candidate_hook_installed", False):
+        return
+    if not getattr(model.config, "is_encoder_decoder", False) or not hasattr(model, "_get_candidate_generator"):
+        return
+
+    from transformers.generation.logits_process import LogitsProcessorList, MinLengthLogitsProcessor
+
+    generator_class = _source_lookup_generator_class()
+    original = model._get_candidate_generator
+
+    def _get_candidate_generator(generation_config, input_ids, inputs_tensor, logits_processor, model_kwargs,
+                                 assistant_model=None, **kwargs):
+        if assistant_model is not None:
+            logits_processor = LogitsProcessorList(
+                p for p in logits_processor if not isinstance(p, MinLengthLogitsProcessor)
+            )
+        if generation_config.prompt_lookup_num_tokens is None or assistant_model is not None:
+            return original(
+                generation_config=generation_config, input_ids=input_ids, inputs_tensor=inputs_tensor,
+                logits_processor=logits_processor, model_kwargs=model_kwargs,
+                assistant_model=assistant_model, **kwargs
+            )
+        source = inputs_tensor[0]
+        mask = model_kwargs.get("attention_mask")
+        if mask is not None:
+            source = source[mask[0].bool()]
+        return generator_class(
+            source_ids=source,
+            eos_token_id=generation_config._eos_token_tensor,
+            num_output_tokens=generation_config.prompt_lookup_num_tokens,
+            max_matching_ngram_size=generation_config.max_matching_ngram_size or PROMPT_LOOKUP_NGRAM,
+            max_length=generation_config.max_length,
+        )
+
+    model._get_candidate_generator = _get_candidate_generator
+    model._candidate_hook_installed = True
+
+def decoding_kwargs(decoding: str, model, draft_model=None) -> dict:
+    """
+    Argumen tambahan generate() untuk mode decoding terpilih
+    """
+    if decoding == "beam":
+        return {}
+    kwargs = {"num_beams": 1}
+    if decoding in SPECULATIVE_MODES:
+        install_candidate_generator(model)
+    if decoding == "prompt_lookup":
+        kwargs["prompt_lookup_num_tokens"] = PROMPT_LOOKUP_TOKENS
+        kwargs["max_matching_ngram_size"] = PROMPT_LOOKUP_NGRAM
+    elif decoding == "assisted":
+        if draft_model is None:
+            raise ValueError("Mode assisted membutuhkan draft model (HIGHLIGHT_DRAFT_MODEL)")
+        kwargs["assistant_model"] = draft_model
+    return kwargs
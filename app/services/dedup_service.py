@@ -0,0 +1,264 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.services import metrics
+
+try:
+    import numpy as np
+except ImportError:  # numpy hanya mempercepat signature; hasilnya sama
+    np = None
+
+# 0 = highlight near-duplicate tidak dipakai (hanya cache exact match)
+DEDUP_THRESHOLD = float(os.getenv("HIGHLIGHT_DEDUP_THRESHOLD", "0"))
+# Kosong = index hanya di memori (hilang saat restart)
+DEDUP_PATH = os.getenv("HIGHLIGHT_DEDUP_PATH", "")
+DEDUP_NUM_PERM = int(os.getenv("HIGHLIGHT_DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS = int(os.getenv("HIGHLIGHT_DEDUP_BANDS", "16"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("HIGHLIGHT_DEDUP_SHINGLE_SIZE", "5"))
+
+# Hash multiply-shift: ((a * h + b) mod 2^64) >> 32. uint64 numpy
+# wrap-around sama dengan & _MASK di Python, jadi signature kedua versi sama
+_MASK = (1 << 64) - 1
+_SEED = 1
+_WORD_RE = re.compile(r"\w+")
+# Jumlah entri untuk stats() / /metrics dihitung ulang paling sering sekali per
+# interval ini; di antaranya hanya ditambah oleh add_many proses ini
+COUNT_REFRESH_SECONDS = 60.0
+
+Signature = bytes
+
+class DuplicateMatch(NamedTuple):
+    key: str
+    similarity: float
+    payload: Optional[str]
+
+def shingles(text: str, size: int = DEDUP_SHINGLE_SIZE) -> List[int]:
+    """
+    Hash crc32 dari n-gram kata (huruf kecil). Teks yang lebih pendek
+    dari satu shingle menjadi satu shingle utuh.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return []
+    if len(words) <= size:
+        return [zlib.crc32(" ".join(words).encode("utf-8"))]
+    return list({zlib.crc32(" ".join(g).encode("utf-8")) for g in zip(*(words[i:] for i in range(size)))})
+
+class NearDuplicateIndex:
+    """
+    Index near-duplicate MinHash + LSH banding di SQLite.
+
+    Signature = num_perm nilai minimum hash multiply-shift atas hash
+    shingle. Signature dibagi menjadi `bands` potongan; artikel yang satu
+    potongan saja sama persis menjadi kandidat, lalu kemiripan Jaccard
+    diperkirakan dari proporsi nilai signature yang sama. Tabel band
+    ber-index sehingga lookup tetap beberapa pencarian B-tree berapa pun
+    jumlah artikel. `namespace` memisahkan entri yang tidak boleh saling
+    cocok (mis. model / parameter generate berbeda).
+    """
+
+    def __init__(
+        self,
+        path: str = "",
+        threshold: float = 0.9,
+        num_perm: int = DEDUP_NUM_PERM,
+        bands: int = DEDUP_BANDS,
+        shingle_size: int = DEDUP_SHINGLE_SIZE
+    ):
+        if num_perm <= 0 or bands <= 0 or num_perm % bands:
+            raise ValueError("num_perm harus kelipatan bands (mis. 128 / 16)")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(_SEED)
+        self._a = [rng.getrandbits(64) | 1 for _ in range(num_perm)]
+        self._b = [rng.getrandbits(64) for _ in range(num_perm)]
+        if np is not None:
+            self._a_np = np.array(self._a, dtype=np.uint64)[:, None]
+            self._b_np = np.array(self._b, dtype=np.uint64)[:, None]
+        self._format = f"<{num_perm}I"
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "added": 0}
+        self._count: Optional[int] = None
+        self._count_at = 0.0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # Dibuka saat pertama dipakai, bukan saat import (aman untuk app.serve yang fork)
+        if self._db is None:
+            db = sqlite3.connect(self.path or ":memory:", check_same_thread=False)
+            if self.path:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute("PRAGMA busy_timeout=30000")
+            db.executescript(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, key TEXT NOT NULL,"
+                " signature BLOB NOT NULL, payload TEXT, created_at REAL NOT NULL,"
+                " UNIQUE (namespace, key));"
+                "CREATE TABLE IF NOT EXISTS bands ("
+                " hash INTEGER NOT NULL, doc INTEGER NOT NULL, PRIMARY KEY (hash, doc)) WITHOUT ROWID;"
+            )
+            # Signature dari parameter lain tidak bisa dibandingkan
+            params = {"num_perm": self.num_perm, "bands": self.bands,
+                      "shingle_size": self.shingle_size, "seed": _SEED}
+            stored = dict(db.execute("SELECT name, value FROM meta").fetchall())
+            if stored and stored != {k: str(v) for k, v in params.items()}:
+                db.close()
+                raise ValueError(f"Index {self.path} dibuat dengan parameter lain: {stored}")
+            db.executemany("INSERT OR IGNORE INTO meta (name, value) VALUES (?, ?)",
+                           [(k, str(v)) for k, v in params.items()])
+            db.commit()
+            self._db = db
+        return self._db
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def signature(self, text: str) -> Optional[Signature]:
+        """Signature MinHash teks (sudah di-preprocess); None jika tidak ada kata."""
+        hashes = shingles(text, self.shingle_size)
+        if not hashes:
+            return None
+        if np is not None:
+            h = self._a_np * np.array(hashes, dtype=np.uint64)[None, :]
+            h += self._b_np
+            h >>= np.uint64(32)
+            values = h.min(axis=1).tolist()
+        else:
+            values = [min(((a * h + b) & _MASK) >> 32 for h in hashes) for a, b in zip(self._a, self._b)]
+        return struct.pack(self._format, *values)
+
+    def similarity(self, a: Signature, b: Signature) -> float:
+        """Perkiraan kemiripan Jaccard dari dua signature."""
+        va, vb = struct.unpack(self._format, a), struct.unpack(self._format, b)
+        return sum(x == y for x, y in zip(va, vb)) / self.num_perm
+
+    def _band_hashes(self, signature: Signature, namespace: str) -> List[int]:
+        width = self.rows * 4
+        prefix = namespace.encode("utf-8") + b"\0"
+        return [
+            int.from_bytes(
+                hashlib.blake2b(prefix + bytes([i]) + signature[i * width:(i + 1) * width], digest_size=8).digest(),
+                "little", signed=True
+            )
+            for i in range(self.bands)
+        ]
+
+    def query(
+        self,
+        signature: Optional[Signature],
+        namespace: str = "",
+        threshold: Optional[float] = None
+    ) -> Optional[DuplicateMatch]:
+        """Entri paling mirip dengan kemiripan >= threshold, atau None."""
+        if signature is None:
+            return None
+        threshold = self.threshold if threshold is None else threshold
+        hashes = self._band_hashes(signature, namespace)
+        with self._lock:
+            # CROSS JOIN: mulai dari index band, bukan scan semua docs dalam namespace
+            rows = self.db.execute(
+                "SELECT DISTINCT d.key, d.signature, d.payload FROM bands b CROSS JOIN docs d"
+                f" ON d.id = b.doc WHERE b.hash IN ({','.join('?' * len(hashes))}) AND d.namespace = ?",
+                (*hashes, namespace)
+            ).fetchall()
+
+        best: Optional[DuplicateMatch] = None
+        for key, other, payload in rows:
+            score = self.similarity(signature, other)
+            if score >= threshold and (best is None or score > best.similarity):
+                best = DuplicateMatch(key, score, payload)
+        with self._lock:
+            self._counters["hits" if best else "misses"] += 1
+        return best
+
+    def add(
+        self,
+        key: str,
+        signature: Optional[Signature],
+        namespace: str = "",
+        payload: Optional[str] = None
+    ) -> bool:
+        """Menambah satu entri; False jika key sudah ada atau teks kosong."""
+        return self.add_many([(key, signature, payload)], namespace) > 0
+
+    def add_many(self, entries: Iterable[Tuple[str, Optional[Signature], Optional[str]]], namespace: str = "") -> int:
+        """Menambah banyak entri (key, signature, payload) dalam satu transaksi."""
+        added = 0
+        now = time.time()
+        with self._lock:
+            db = self.db
+            try:
+                for key, signature, payload in entries:
+                    if signature is None:
+                        continue
+                    cur = db.execute(
+                        "INSERT OR IGNORE INTO docs (namespace, key, signature, payload, created_at)"
+                        " VALUES (?, ?, ?, ?, ?)", (namespace, key, signature, payload, now)
+                    )
+                    if cur.rowcount == 0:
+                        continue
+                    db.executemany(
+                        "INSERT OR IGNORE INTO bands (hash, doc) VALUES (?, ?)",
+                        [(h, cur.lastrowid) for h in self._band_hashes(signature, namespace)]
+                    )
+                    added += 1
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+            self._counters["added"] += added
+            if self._count is not None:
+                self._count += added
+        return added
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._count = self.db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            self._count_at = time.monotonic()
+            return self._count
+
+    def entries(self) -> int:
+        """Jumlah entri tanpa COUNT(*) di setiap panggilan (lihat COUNT_REFRESH_SECONDS)."""
+        if self._db is None and not self.path:
+            return 0
+        if self._count is None or time.monotonic() - self._count_at > COUNT_REFRESH_SECONDS:
+            return len(self)
+        return self._count
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            **self._counters,
+            "entries": self.entries(),
+            "threshold": self.threshold,
+        }
+
+# Highlight dipakai ulang untuk artikel yang hampir identik (di atas threshold)
+highlight_dedup = NearDuplicateIndex(DEDUP_PATH, threshold=DEDUP_THRESHOLD)
+
+for _name in ("hits", "misses"):
+    metrics.registry.gauge(
+        f"highlight_dedup_{_name}_total",
+        f"Lookup highlight near-duplicate: {_name}",
+        lambda n=_name: highlight_dedup.stats()[n],
+        kind="counter"
+    )
+metrics.registry.gauge("highlight_dedup_entries", "Jumlah artikel di index near-duplicate",
+                       highlight_dedup.entries)
@@ -0,0 +1,361 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from app.services import metrics
+from app.services.summarizer_service import InferenceQueueFull, batcher, generate_highlights_batch
+
+logger = logging.getLogger(__name__)
+
+# Antrean job persisten (SQLite); job & progress tetap ada setelah restart
+JOBS_PATH = os.getenv("HIGHLIGHT_JOBS_PATH", "highlight_jobs.db")
+# Jumlah thread yang memproses job; 0 = API job hanya menerima & menyimpan
+JOB_WORKERS = int(os.getenv("HIGHLIGHT_JOB_WORKERS", "1"))
+# Item yang diambil per putaran; hasilnya di-commit sekaligus (checkpoint)
+JOB_CHUNK_SIZE = int(os.getenv("HIGHLIGHT_JOB_CHUNK_SIZE", "16"))
+JOB_MAX_ITEMS = int(os.getenv("HIGHLIGHT_JOB_MAX_ITEMS", "100000"))
+
+# uploading -> queued -> running -> done; upload yang terputus -> failed
+JOB_STATUSES = ("uploading", "queued", "running", "done", "failed")
+
+JOB_ITEMS = metrics.registry.counter("highlight_job_items_total", "Item job yang selesai diproses")
+
+class JobNotFound(KeyError):
+    pass
+
+class JobStore:
+    """
+    Tabel jobs + job_items di SQLite. Item berstatus pending -> claimed ->
+    done/failed; klaim milik proses yang sudah mati dikembalikan ke
+    pending, jadi job lanjut dari item terakhir yang sudah di-commit.
+    """
+
+    def __init__(self, path: str = JOBS_PATH):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # Dibuka saat pertama dipakai, bukan saat import (aman untuk app.serve yang fork)
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA busy_timeout=30000")
+            db.executescript(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, status TEXT NOT NULL, params TEXT NOT NULL,"
+                " total INTEGER NOT NULL DEFAULT 0, done INTEGER NOT NULL DEFAULT 0,"
+                " failed INTEGER NOT NULL DEFAULT 0, error TEXT,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL, finished_at REAL);"
+                "CREATE TABLE IF NOT EXISTS job_items ("
+                " job_id TEXT NOT NULL, idx INTEGER NOT NULL, item_id TEXT, content TEXT NOT NULL,"
+                " max_length INTEGER, min_length INTEGER, no_repeat_ngram_size INTEGER, model TEXT,"
+                " status TEXT NOT NULL DEFAULT 'pending', claimed_by INTEGER,"
+                " highlight TEXT, error TEXT, PRIMARY KEY (job_id, idx));"
+                "CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status, job_id, idx);"
+            )
+            self._db = db
+        return self._db
+
+    @property
+    def exists(self) -> bool:
+        # File belum ada = belum pernah ada job; jangan dibuat hanya karena app start
+        return self._db is not None or os.path.exists(self.path)
+
+    def create(self, params: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self.db.execute(
+                "INSERT INTO jobs (id, status, params, created_at, updated_at) VALUES (?, 'uploading', ?, ?, ?)",
+                (job_id, json.dumps(params), now, now)
+            )
+        return job_id
+
+    def add_items(self, job_id: str, start: int, items: Sequence[dict]):
+        rows = [
+            (job_id, start + i, item.get("id"), item["content"], item.get("max_length"),
+             item.get("min_length"), item.get("no_repeat_ngram_size"), item.get("model"))
+            for i, item in enumerate(items)
+        ]
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.executemany(
+                    "INSERT INTO job_items (job_id, idx, item_id, content, max_length, min_length,"
+                    " no_repeat_ngram_size, model) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self.db.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def finish_upload(self, job_id: str, total: int):
+        with self._lock:
+            self.db.execute(
+                "UPDATE jobs SET status = 'queued', total = ?, updated_at = ? WHERE id = ?",
+                (total, time.time(), job_id)
+            )
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+            self.db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self.db.execute("COMMIT")
+
+    def get(self, job_id: str) -> dict:
+        if not self.exists:
+            raise JobNotFound(job_id)
+        with self._lock:
+            row = self.db.execute(
+                "SELECT id, status, params, total, done, failed, error, created_at, updated_at, finished_at"
+                " FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            raise JobNotFound(job_id)
+        keys = ("id", "status", "params", "total", "done", "failed", "error", "created_at", "updated_at",
+                "finished_at")
+        job = dict(zip(keys, row))
+        job["params"] = json.loads(job["params"])
+        job["pending"] = job["total"] - job["done"] - job["failed"]
+        return job
+
+    def results(self, job_id: str, after: int = -1, page_size: int = 500) -> Iterator[dict]:
+        """
+        Hasil item yang sudah selesai, urut index, dibaca per halaman
+        supaya job besar tidak dimuat sekaligus ke memori
+        """
+        while True:
+            with self._lock:
+                rows = self.db.execute(
+                    "SELECT idx, item_id, highlight, error FROM job_items"
+                    " WHERE job_id = ? AND idx > ? AND status IN ('done', 'failed') ORDER BY idx LIMIT ?",
+                    (job_id, after, page_size)
+                ).fetchall()
+            for idx, item_id, highlight, error in rows:
+                yield {"index": idx, "id": item_id, "highlight": highlight, "error": error}
+            if len(rows) < page_size:
+                return
+            after = rows[-1][0]
+
+    def recover(self):
+        """
+        Dipanggil saat startup: klaim milik proses yang sudah tidak ada
+        dikembalikan ke pending, upload yang terputus ditandai gagal
+        """
+        with self._lock:
+            owners = [r[0] for r in self.db.execute(
+                "SELECT DISTINCT claimed_by FROM job_items WHERE status = 'claimed'"
+            ).fetchall()]
+            dead = [pid for pid in owners if pid is None or not _process_alive(pid)]
+            for pid in dead:
+                self.db.execute(
+                    "UPDATE job_items SET status = 'pending', claimed_by = NULL"
+                    " WHERE status = 'claimed' AND claimed_by IS ?", (pid,)
+                )
+            # Upload dari proses lain yang masih jalan (app.serve) tidak bisa dibedakan,
+            # jadi hanya yang sudah lama tidak bergerak yang dianggap terputus
+            self.db.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Upload terputus', updated_at = ?"
+                " WHERE status = 'uploading' AND updated_at < ?", (time.time(), time.time() - 3600)
+            )
+        if dead:
+            logger.info("Job: %d klaim item dari proses yang berhenti dikembalikan ke antrean", len(dead))
+
+    def claim(self, limit: int) -> Tuple[Optional[str], List[tuple]]:
+        """
+        Mengambil sampai `limit` item pending dari job paling lama
+        """
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute(
+                    "SELECT j.id FROM jobs j WHERE j.status IN ('queued', 'running') AND EXISTS ("
+                    " SELECT 1 FROM job_items i WHERE i.job_id = j.id AND i.status = 'pending')"
+                    " ORDER BY j.created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self.db.execute("COMMIT")
+                    return None, []
+                job_id = row[0]
+                items = self.db.execute(
+                    "SELECT idx, content, max_length, min_length, no_repeat_ngram_size, model FROM job_items"
+                    " WHERE job_id = ? AND status = 'pending' ORDER BY idx LIMIT ?", (job_id, limit)
+                ).fetchall()
+                self.db.executemany(
+                    "UPDATE job_items SET status = 'claimed', claimed_by = ? WHERE job_id = ? AND idx = ?",
+                    [(os.getpid(), job_id, item[0]) for item in items]
+                )
+                self.db.execute(
+                    "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                    (time.time(), job_id)
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return job_id, items
+
+    def complete(self, job_id: str, results: Sequence[Tuple[int, Optional[str], Optional[str]]]):
+        """
+        Checkpoint: hasil satu putaran + progress job di-commit bersama
+        """
+        done = sum(1 for _, _, error in results if error is None)
+        now = time.time()
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.executemany(
+                    "UPDATE job_items SET status = ?, highlight = ?, error = ?, claimed_by = NULL"
+                    " WHERE job_id = ? AND idx = ?",
+                    [("done" if error is None else "failed", highlight, error, job_id, idx)
+                     for idx, highlight, error in results]
+                )
+                self.db.execute(
+                    "UPDATE jobs SET done = done + ?, failed = failed + ?, updated_at = ? WHERE id = ?",
+                    (done, len(results) - done, now, job_id)
+                )
+                self.db.execute(
+                    "UPDATE jobs SET status = 'done', finished_at = ? WHERE id = ? AND status = 'running'"
+                    " AND NOT EXISTS (SELECT 1 FROM job_items WHERE job_id = ? AND status IN ('pending', 'claimed'))",
+                    (now, job_id, job_id)
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        # Klaim proses ini sendiri dari sebelum restart (pid dipakai ulang) tidak sedang dikerjakan
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobRunner:
+    """
+    Thread latar yang mengambil item job per putaran, meringkas lewat
+    generate_highlights_batch (diurutkan per panjang token & digabung per
+    batch) di worker inference bersama trafik online, lalu menyimpan
+    hasilnya sebagai checkpoint.
+    """
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, chunk_size: int = JOB_CHUNK_SIZE):
+        self.store = store
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """
+        Thread dijalankan sekarang jika database job sudah ada (job lama
+        dilanjutkan), atau saat job pertama masuk (notify)
+        """
+        if self.workers <= 0:
+            return
+        self._stop.clear()
+        self._started = True
+        if self.store.exists:
+            self._start_threads()
+
+    def _start_threads(self):
+        with self._start_lock:
+            if not self._started or self._threads:
+                return
+            self.store.recover()
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"highlight-job-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Berhenti setelah putaran yang sedang jalan; item yang belum
+        di-commit dikerjakan ulang setelah restart
+        """
+        self._started = False
+        self._stop.set()
+        self._wake.set()
+        with self._start_lock:
+            for t in self._threads:
+                t.join(timeout)
+            self._threads = []
+
+    def notify(self):
+        self._start_threads()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job_id, items = self.store.claim(self.chunk_size)
+            except sqlite3.Error:
+                logger.exception("Job: gagal mengambil item")
+                self._stop.wait(5)
+                continue
+            if not items:
+                self._wake.wait(5)
+                self._wake.clear()
+                continue
+            try:
+                self.store.complete(job_id, self._process(job_id, items))
+            except sqlite3.Error:
+                # Klaim tetap milik proses ini; dikembalikan ke pending oleh recover() saat restart
+                logger.exception("Job %s: gagal menyimpan hasil", job_id)
+
+    def _process(self, job_id: str, items: List[tuple]) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        params = self.store.get(job_id)["params"]
+        batch = [
+            (
+                content,
+                max_length if max_length is not None else params["max_length"],
+                min_length if min_length is not None else params["min_length"],
+                no_repeat_ngram_size if no_repeat_ngram_size is not None else params["no_repeat_ngram_size"],
+                model or params.get("model"),
+            )
+            for _, content, max_length, min_length, no_repeat_ngram_size, model in items
+        ]
+        while True:
+            try:
+                future = batcher.submit_call(generate_highlights_batch, batch, decoding=params.get("decoding"))
+                break
+            except InferenceQueueFull:
+                # Trafik online didahulukan; coba lagi saat antrean longgar
+                if self._stop.wait(0.5):
+                    return []
+        try:
+            outputs = future.result()
+        except Exception as e:
+            outputs = [(None, str(e))] * len(items)
+
+        for _, error in outputs:
+            JOB_ITEMS.inc(result="done" if error is None else "failed")
+        return [(item[0], highlight, error) for item, (highlight, error) in zip(items, outputs)]
+
+job_store = JobStore()
+job_runner = JobRunner(job_store)
+
+def _pending_items() -> Optional[float]:
+    if job_store._db is None:
+        return None
+    with job_store._lock:
+        return job_store.db.execute("SELECT COUNT(*) FROM job_items WHERE status = 'pending'").fetchone()[0]
+
+metrics.registry.gauge("highlight_job_items_pending", "Item job yang belum diproses", _pending_items)
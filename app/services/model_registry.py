@@ -0,0 +1,275 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# File yang menentukan hasil tokenisasi; dua checkpoint dengan isi file
+# yang sama boleh memakai satu objek tokenizer
+TOKENIZER_FILES = (
+    "spiece.model",
+    "tokenizer.json",
+    "tokenizer_config.json",
+    "special_tokens_map.json",
+    "added_tokens.json",
+    "vocab.json",
+    "merges.txt",
+)
+
+def model_fingerprint(path: str) -> str:
+    """
+    Identitas model untuk kunci cache: path + waktu modifikasi file di
+    dalamnya, supaya checkpoint yang diganti tidak memakai cache lama
+    """
+    mtimes = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            mtimes.append(f"{name}:{os.stat(os.path.join(path, name)).st_mtime_ns}")
+    return path + "|" + ",".join(mtimes)
+
+def tokenizer_fingerprint(path: str) -> str:
+    h = hashlib.sha256()
+    for name in TOKENIZER_FILES:
+        file_path = os.path.join(path, name)
+        if os.path.isfile(file_path):
+            h.update(name.encode("utf-8") + b"\0")
+            with open(file_path, "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+class UnknownModelError(KeyError):
+    pass
+
+class LoadedModel:
+    def __init__(
+        self,
+        path: str,
+        backend: str,
+        model,
+        tokenizer,
+        tokenizer_lock: Optional[threading.Lock] = None,
+        memory_bytes: int = 0
+    ):
+        self.path = path
+        self.backend = backend
+        self.model_id = model_fingerprint(path) + "|" + backend
+        self.model = model
+        self.tokenizer = tokenizer
+        self.tokenizer_fingerprint = tokenizer_fingerprint(path)
+        # Tokenizer fast (Rust) tidak boleh dipakai dua thread sekaligus;
+        # lock ikut dibagi jika tokenizer dipakai bersama model lain
+        self.tokenizer_lock = tokenizer_lock or threading.Lock()
+        self.memory_bytes = memory_bytes
+
+        # Default generate & prefix sama seperti pipeline("summarization"):
+        # default pipeline (beam search 4) ditimpa generation_config model,
+        # lalu task_specific_params["summarization"] dari config
+        from transformers import GenerationConfig
+
+        self.generation_config = GenerationConfig(max_new_tokens=256, num_beams=4)
+        self.generation_config.update(**model.generation_config.to_diff_dict())
+        self.prefix = getattr(model.config, "prefix", None) or ""
+        task_params = (getattr(model.config, "task_specific_params", None) or {}).get("summarization")
+        if task_params:
+            task_params = dict(task_params)
+            self.prefix = task_params.pop("prefix", self.prefix) or ""
+            self.generation_config.update(**task_params)
+        if tokenizer.pad_token_id is not None and self.generation_config.pad_token_id is None:
+            self.generation_config.pad_token_id = tokenizer.pad_token_id
+
+class ModelRegistry:
+    """
+    Memuat model secara lazy (bukan saat import), supaya package bisa
+    diimport tanpa torch. Status `ready` baru True setelah model dimuat
+    dan warmup (jika sedang berjalan) selesai.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        backend: str = "torch",
+        torch_threads: int = 0,
+        pool: Optional["ModelPool"] = None
+    ):
+        self.path = path
+        self.backend = backend
+        self.torch_threads = torch_threads
+        self.pool = pool
+        self.warming = False
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.last_used = 0.0
+        self._loaded: Optional[LoadedModel] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded is not None
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded is not None and not self.warming
+
+    def get(self) -> LoadedModel:
+        loaded = self._loaded
+        if loaded is None:
+            loaded = self.load()
+        self.last_used = time.monotonic()
+        return loaded
+
+    def unload(self):
+        """
+        Melepas referensi model; request yang masih memakainya tetap
+        selesai, memori dibebaskan setelah referensi terakhir hilang
+        """
+        with self._lock:
+            self._loaded = None
+            self.load_seconds = None
+
+    def load(self) -> LoadedModel:
+        with self._lock:
+            if self._loaded is not None:
+                return self._loaded
+
+            import torch
+            from transformers import AutoTokenizer
+
+            from app.services.backends import estimate_model_bytes, load_seq2seq
+
+            start = time.perf_counter()
+            try:
+                if self.torch_threads > 0:
+                    torch.set_num_threads(self.torch_threads)
+                shared = self.pool.find_tokenizer(tokenizer_fingerprint(self.path)) if self.pool else None
+                if shared is not None:
+                    tokenizer, tokenizer_lock = shared.tokenizer, shared.tokenizer_lock
+                else:
+                    tokenizer, tokenizer_lock = AutoTokenizer.from_pretrained(self.path), None
+                model = load_seq2seq(self.path, self.backend)
+            except Exception as e:
+                self.error = str(e)
+                raise
+            self._loaded = LoadedModel(
+                self.path, self.backend, model, tokenizer,
+                tokenizer_lock=tokenizer_lock,
+                memory_bytes=estimate_model_bytes(model, self.path, self.backend)
+            )
+            self.load_seconds = time.perf_counter() - start
+            self.last_used = time.monotonic()
+            self.error = None
+            return self._loaded
+
+    def status(self) -> dict:
+        loaded = self._loaded
+        return {
+            "path": self.path,
+            "backend": self.backend,
+            "loaded": loaded is not None,
+            "ready": self.ready,
+            "memory_bytes": loaded.memory_bytes if loaded else None,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+def parse_models(spec: str, default_path: str) -> Dict[str, str]:
+    """
+    "wikidepia=models/finetuned_wikidepia,cahya=models/finetuned_cahya"
+    -> {nama: path}. Spec kosong = satu model dari default_path, dengan
+    nama dari nama foldernya tanpa awalan "finetuned_"
+    """
+    models: Dict[str, str] = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        name, sep, path = entry.partition("=")
+        if not sep or not name.strip() or not path.strip():
+            raise ValueError(f"Format model tidak valid: {entry!r} (harus nama=path)")
+        models[name.strip()] = path.strip()
+    if not models:
+        name = os.path.basename(default_path.rstrip("/"))
+        if name.startswith("finetuned_"):
+            name = name[len("finetuned_"):]
+        models[name or "default"] = default_path
+    return models
+
+class ModelPool:
+    """
+    Beberapa checkpoint dalam satu proses, dipilih per request dengan
+    nama. Model selain default dimuat lazy saat pertama dipakai; jika
+    total memori melewati memory_budget_bytes, model yang paling lama
+    tidak dipakai dilepas (model default tidak pernah dilepas).
+    Tokenizer dengan file yang identik dipakai bersama.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, str],
+        default: Optional[str] = None,
+        backend: str = "torch",
+        torch_threads: int = 0,
+        memory_budget_bytes: int = 0
+    ):
+        if not models:
+            raise ValueError("Minimal satu model harus didaftarkan")
+        self.default = default or next(iter(models))
+        if self.default not in models:
+            raise ValueError(f"Model default tidak terdaftar: {self.default}")
+        self.memory_budget_bytes = memory_budget_bytes
+        self.evictions = 0
+        self._entries = {
+            name: ModelRegistry(path, backend=backend, torch_threads=torch_threads, pool=self)
+            for name, path in models.items()
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    def resolve(self, name: Optional[str] = None) -> str:
+        name = name or self.default
+        if name not in self._entries:
+            raise UnknownModelError(name)
+        return name
+
+    def entry(self, name: Optional[str] = None) -> ModelRegistry:
+        return self._entries[self.resolve(name)]
+
+    def get(self, name: Optional[str] = None) -> LoadedModel:
+        entry = self.entry(name)
+        if entry.loaded:
+            return entry.get()
+        loaded = entry.get()
+        self._evict(keep=entry)
+        return loaded
+
+    def find_tokenizer(self, fingerprint: str) -> Optional[LoadedModel]:
+        for entry in self._entries.values():
+            loaded = entry._loaded
+            if loaded is not None and loaded.tokenizer_fingerprint == fingerprint:
+                return loaded
+        return None
+
+    def memory_bytes(self) -> int:
+        return sum(e._loaded.memory_bytes for e in self._entries.values() if e._loaded is not None)
+
+    def _evict(self, keep: ModelRegistry):
+        if self.memory_budget_bytes <= 0:
+            return
+        with self._lock:
+            candidates = sorted(
+                (e for name, e in self._entries.items()
+                 if e.loaded and e is not keep and name != self.default),
+                key=lambda e: e.last_used
+            )
+            for entry in candidates:
+                if self.memory_bytes() <= self.memory_budget_bytes:
+                    break
+                entry.unload()
+                self.evictions += 1
+
+    def status(self) -> Dict[str, dict]:
+        return {
+            name: {**entry.status(), "default": name == self.default}
+            for name, entry in self._entries.items()
+        }
@@ -1,48 +1,204 @@
+import os
 import re
-from transformers import pipeline
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
 
-MODEL_PATH = "models/finetuned_wikidepia"
+from app.services import metrics
+from app.services.cache_service import encoder_cache, encoder_cache_key, highlight_cache, make_cache_key
+from app.services.dedup_service import Signature, highlight_dedup
+from app.services.decoding import SPECULATIVE_MODES, decoding_family, decoding_kwargs, resolve_decoding
+from app.services.model_registry import LoadedModel, ModelPool, ModelRegistry, parse_models
+
+MODEL_PATH = os.getenv("HIGHLIGHT_MODEL_PATH", "models/finetuned_wikidepia")
+# Beberapa checkpoint sekaligus: "wikidepia=models/finetuned_wikidepia,cahya=models/finetuned_cahya".
+# Kosong = hanya MODEL_PATH. Model default = HIGHLIGHT_DEFAULT_MODEL atau entri pertama
+MODELS = parse_models(os.getenv("HIGHLIGHT_MODELS", ""), MODEL_PATH)
+DEFAULT_MODEL = os.getenv("HIGHLIGHT_DEFAULT_MODEL", "") or None
+# Draft model kecil (tokenizer sama) untuk decoding "assisted"; kosong = tidak tersedia
+DRAFT_MODEL_PATH = os.getenv("HIGHLIGHT_DRAFT_MODEL", "")
+# Batas memori total model yang dimuat (MB); 0 = tanpa batas
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("HIGHLIGHT_MODEL_MEMORY_MB", "0"))
 MAX_INPUT_TOKENS = 512  
+# torch | onnx | onnx-int8 (lihat app/services/backends.py)
+BACKEND = os.getenv("HIGHLIGHT_BACKEND", "torch")
+
+# Micro-batching: request yang kompatibel digabung jadi satu generate()
+BATCH_MAX_SIZE = int(os.getenv("HIGHLIGHT_BATCH_MAX_SIZE", "8"))
+BATCH_WAIT_MS = float(os.getenv("HIGHLIGHT_BATCH_WAIT_MS", "10"))
+BATCH_LENGTH_BUCKET = int(os.getenv("HIGHLIGHT_BATCH_LENGTH_BUCKET", "64"))
+
+# Eksekusi inference di thread worker terpisah dari event loop
+INFERENCE_WORKERS = max(1, int(os.getenv("HIGHLIGHT_INFERENCE_WORKERS", "1")))
+INFERENCE_QUEUE_SIZE = int(os.getenv("HIGHLIGHT_QUEUE_SIZE", "64"))
+# 0 = bagi rata core CPU ke setiap worker
+TORCH_THREADS = int(os.getenv("HIGHLIGHT_TORCH_THREADS", "0"))
+
+# Mode artikel panjang (map-reduce): ukuran jendela token, overlap
+# antar jendela, dan batas jumlah jendela per artikel
+LONG_DOC_CHUNK_TOKENS = int(os.getenv("HIGHLIGHT_LONG_CHUNK_TOKENS", str(MAX_INPUT_TOKENS)))
+LONG_DOC_OVERLAP = int(os.getenv("HIGHLIGHT_LONG_OVERLAP", "64"))
+LONG_DOC_MAX_CHUNKS = int(os.getenv("HIGHLIGHT_LONG_MAX_CHUNKS", "8"))
 
-summarizer = pipeline(
-    "summarization",
-    model=MODEL_PATH,
-    tokenizer=MODEL_PATH
+# Batas waktu request (detik) jika client tidak menentukan, dan batas atas
+# yang boleh diminta client (field timeout / header X-Request-Timeout); 0 = tanpa batas
+REQUEST_TIMEOUT = float(os.getenv("HIGHLIGHT_REQUEST_TIMEOUT", "30"))
+MAX_REQUEST_TIMEOUT = float(os.getenv("HIGHLIGHT_MAX_REQUEST_TIMEOUT", "120"))
+
+# Panjang input (token) untuk generate dummy saat warmup; kosong = tanpa warmup
+WARMUP_LENGTHS = [int(n) for n in os.getenv("HIGHLIGHT_WARMUP_LENGTHS", "64,256,512").split(",") if n.strip()]
+
+# Model dimuat lazy / saat startup aplikasi, bukan saat modul diimport
+model_pool = ModelPool(
+    MODELS,
+    default=DEFAULT_MODEL,
+    backend=BACKEND,
+    torch_threads=TORCH_THREADS or max(1, (os.cpu_count() or 1) // INFERENCE_WORKERS),
+    memory_budget_bytes=int(MODEL_MEMORY_BUDGET_MB * 1024 * 1024)
 )
+# Registry model default: dimuat + warmup saat startup, dasar status /ready
+model_registry = model_pool.entry()
+
+draft_registry = ModelRegistry(DRAFT_MODEL_PATH, backend="torch", pool=model_pool) if DRAFT_MODEL_PATH else None
+
+def get_model(name: Optional[str] = None) -> LoadedModel:
+    return model_pool.get(name)
+
+def get_draft_model(target: LoadedModel):
+    """
+    Draft model untuk assisted decoding; harus memakai tokenizer yang sama
+    dengan model target karena token kandidat diverifikasi apa adanya
+    """
+    if draft_registry is None:
+        return None
+    draft = draft_registry.get()
+    if draft.tokenizer_fingerprint != target.tokenizer_fingerprint:
+        raise ValueError("Draft model harus memakai tokenizer yang sama dengan model target")
+    return draft.model
+
+def highlight_cache_key(
+    text: str,
+    m: LoadedModel,
+    max_length: int,
+    min_length: int,
+    no_repeat_ngram_size: int,
+    decoding: str = "beam",
+    *extra
+) -> str:
+    params = (max_length, min_length, no_repeat_ngram_size)
+    # Mode greedy & turunannya berbagi cache; kunci beam tetap seperti sebelumnya
+    if decoding_family(decoding) != "beam":
+        params += (decoding_family(decoding),)
+    return make_cache_key(text, m.model_id, *params, *extra)
 
-tokenizer = summarizer.tokenizer
+class HighlightKey(NamedTuple):
+    cache_key: str
+    namespace: str = ""
+    signature: Optional[Signature] = None
+
+def lookup_highlight(
+    text: str,
+    m: LoadedModel,
+    max_length: int,
+    min_length: int,
+    no_repeat_ngram_size: int,
+    decoding: str = "beam",
+    *extra
+) -> Tuple[Optional[str], HighlightKey]:
+    """
+    Highlight dari cache (teks sama persis) atau, jika HIGHLIGHT_DEDUP_THRESHOLD
+    aktif, dari artikel hampir identik dengan model & parameter yang sama.
+    Kunci yang dikembalikan dipakai remember_highlight setelah generate.
+    """
+    params = (m, max_length, min_length, no_repeat_ngram_size, decoding, *extra)
+    cache_key = highlight_cache_key(text, *params)
+    cached = highlight_cache.get(cache_key)
+    if cached is not None or not highlight_dedup.enabled:
+        return cached, HighlightKey(cache_key)
+
+    # Namespace = kunci cache tanpa teks: hanya cocok dengan model & parameter sama
+    namespace = highlight_cache_key("", *params)
+    signature = highlight_dedup.signature(text)
+    match = highlight_dedup.query(signature, namespace)
+    if match is not None:
+        highlight_cache.set(cache_key, match.payload)
+        return match.payload, HighlightKey(cache_key)
+    return None, HighlightKey(cache_key, namespace, signature)
+
+def remember_highlight(key: HighlightKey, highlight: str):
+    highlight_cache.set(key.cache_key, highlight)
+    if key.signature is not None:
+        highlight_dedup.add(key.cache_key, key.signature, key.namespace, highlight)
 
 #   FUNGSI-FUNGSI PREPROCESS
+# Semua pola dikompilasi sekali saat import
+_TEMPO_LINE_RE = re.compile(r'(?i)^\s*TEMPO\.CO\s*,?\s*[A-Za-z. ]+?-+\s*$\n?', re.MULTILINE)
+_TEMPO_PREFIX_RE = re.compile(r'(?i)^\s*TEMPO\.CO\s*,?\s*[A-Za-z. ]+?-+\s*')
+_INFO_PREFIX_RE = re.compile(r'^(INFO\s+[A-Z]+\s*-\s*)', re.IGNORECASE)
+_LEADING_DASH_RE = re.compile(r'^[\-\—]\s*')
+_FIRST_LETTER_GLUE_RE = re.compile(r'^([A-Za-z])\s+([a-z]+)')
+_FIRST_LETTER_CAPS_RE = re.compile(r'^([A-Z])\s+([A-Z][a-zA-Z]+)')
+_STRAY_LETTER_RE = re.compile(r'\b([a-zA-Z])\s+(?=[a-z])')
+_BOILERPLATE_PATTERNS = [
+    re.compile(p, re.IGNORECASE | re.MULTILINE)
+    for p in (
+        r'Baca juga:.*$',
+        r'Ikuti berita.*$',
+        r'Dapatkan update.*$',
+        r'Klik untuk.*$',
+        r'\bTEMPO\.CO\b\s*$',
+    )
+]
+# Empat pola pertama sama-sama memotong baris sampai akhir, jadi cukup
+# satu scan: baris dipotong di kemunculan paling awal salah satunya
+_BOILERPLATE_TAIL_RE = re.compile(
+    r'(?:Baca juga:|Ikuti berita|Dapatkan update|Klik untuk).*$',
+    re.IGNORECASE | re.MULTILINE
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+_MULTI_SPACE_RE = re.compile(r'\s{2,}')
+_SPACE_BEFORE_PUNCT_RE = re.compile(r'\s+([.,!?;:])')
+_SPACE_BEFORE_CLOSING_RE = re.compile(r'\s+([,.!?):])')
+_SPACE_BEFORE_QUOTE_RE = re.compile(r'\s+(["”])')
+_QUOTE_BEFORE_LETTER_RE = re.compile(r'(["”])(?=[A-Za-z])')
+_PAREN_WORD_RE = re.compile(r'\(\s*([A-Za-z0-9]+)\s*\)')
+# Gabungan spasi-sebelum-tanda-baca dari fix_punct_spacing_strict & fix_spacing
+_SPACE_BEFORE_ANY_PUNCT_RE = re.compile(r'\s+(?=[.,!?;:)"”])')
+_SENTENCE_END_RE = re.compile(r'[.!?]$')
+_TRAILING_PUNCT_RE = re.compile(r'[\-:;,]+$')
+
 def strip_tempo_prefix(text: str) -> str:
     if not isinstance(text, str):
         return ""
     # 1) Hapus baris mandiri "TEMPO.CO , Kota -"
-    text = re.sub(r'(?i)^\s*TEMPO\.CO\s*,?\s*[A-Za-z. ]+?-+\s*$\n?', '', text, flags=re.MULTILINE)
+    text = _TEMPO_LINE_RE.sub('', text)
     # 2) Hapus prefix di awal paragraf:
-    text = re.sub(r'(?i)^\s*TEMPO\.CO\s*,?\s*[A-Za-z. ]+?-+\s*', '', text).strip()
+    text = _TEMPO_PREFIX_RE.sub('', text).strip()
     return text
 
 def remove_info_prefix(text: str) -> str:
     if not isinstance(text, str):
         return ""
     # Hapus awalan seperti "INFO NASIONAL -", "INFO BISNIS -"
-    return re.sub(r'^(INFO\s+[A-Z]+\s*-\s*)', '', text, flags=re.IGNORECASE).strip()
+    return _INFO_PREFIX_RE.sub('', text).strip()
 
 def remove_leading_dash(text: str) -> str:
     if not isinstance(text, str):
         return ""
     # Hapus "-" atau "—" di awal kalimat
-    return re.sub(r'^[\-\—]\s*', '', text).strip()
+    return _LEADING_DASH_RE.sub('', text).strip()
 
 def fix_first_word_glue_and_caps(text: str) -> str:
     if not isinstance(text, str):
         return ""
     
     # 1) Fix kasus huruf pertama terpisah: "A DA" → "Ada"
-    text = re.sub(r'^([A-Za-z])\s+([a-z]+)', lambda m: m.group(1) + m.group(2), text)
+    text = _FIRST_LETTER_GLUE_RE.sub(lambda m: m.group(1) + m.group(2), text)
 
     # 2) Fix kasus Tempo: "L EGALISASI" → "Legalisasi"
-    text = re.sub(r'^([A-Z])\s+([A-Z][a-zA-Z]+)', lambda m: m.group(1) + m.group(2).lower(), text)
+    text = _FIRST_LETTER_CAPS_RE.sub(lambda m: m.group(1) + m.group(2).lower(), text)
 
     # 3) Kapitalisasi awal kalimat
     return text[:1].upper() + text[1:] if text else text
@@ -82,44 +238,37 @@ def drop_stray_repeated_letter(text: str) -> str:
     if not isinstance(text, str):
         return ""
     # Hapus huruf tunggal nyasar sebelum kata: "Polisi i mengatakan" → "Polisi mengatakan"
-    return re.sub(r'\b([a-zA-Z])\s+(?=[a-z])', '', text)
+    return _STRAY_LETTER_RE.sub('', text)
 
 def remove_tempo_boilerplate(text: str) -> str:
     if not isinstance(text, str):
         return ""
-    patterns = [
-        r'Baca juga:.*$',
-        r'Ikuti berita.*$',
-        r'Dapatkan update.*$',
-        r'Klik untuk.*$',
-        r'\bTEMPO\.CO\b\s*$'
-    ]
-    for p in patterns:
-        text = re.sub(p, '', text, flags=re.IGNORECASE | re.MULTILINE)
+    for p in _BOILERPLATE_PATTERNS:
+        text = p.sub('', text)
     return text.strip()
 
 def fix_punct_spacing_strict(text: str) -> str:
     if not isinstance(text, str):
         return ""
     # Hilangkan spasi ganda
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RE.sub(' ', text)
     # Rapikan spasi sebelum tanda baca
-    text = re.sub(r'\s+([.,!?;:])', r'\1', text)
+    text = _SPACE_BEFORE_PUNCT_RE.sub(r'\1', text)
     return text.strip()
 
 def rapikan_singkatan(text: str) -> str:
     if not isinstance(text, str):
         return ""
     # Hapus spasi setelah "(" dan sebelum ")"
-    return re.sub(r'\(\s*([A-Za-z0-9]+)\s*\)', r'(\1)', text)
+    return _PAREN_WORD_RE.sub(r'(\1)', text)
 
 def ensure_period(text: str) -> str:
     if not isinstance(text, str):
         return ""
     text = text.strip()
-    if re.search(r'[.!?]$', text):
+    if _SENTENCE_END_RE.search(text):
         return text
-    text = re.sub(r'[\-:;,]+$', '', text).strip()
+    text = _TRAILING_PUNCT_RE.sub('', text).strip()
     return text + '.'
 
 def fix_spacing(text: str) -> str:
@@ -127,17 +276,21 @@ def fix_spacing(text: str) -> str:
         return ""
     
     # Hilangkan spasi sebelum tanda baca umum
-    text = re.sub(r'\s+([,.!?):])', r'\1', text)
+    text = _SPACE_BEFORE_CLOSING_RE.sub(r'\1', text)
     # Hilangkan spasi sebelum tanda kutip penutup
-    text = re.sub(r'\s+(["”])', r'\1', text)
+    text = _SPACE_BEFORE_QUOTE_RE.sub(r'\1', text)
     # Pastikan ada spasi setelah kutip kalau diikuti huruf
-    text = re.sub(r'(["”])(?=[A-Za-z])', r'\1 ', text)
+    text = _QUOTE_BEFORE_LETTER_RE.sub(r'\1 ', text)
     # Rapikan spasi ganda
-    text = re.sub(r'\s{2,}', ' ', text)
+    text = _MULTI_SPACE_RE.sub(' ', text)
 
     return text.strip()
 
-def preprocess_input_text(content: str) -> str:
+def preprocess_input_text_chain(content: str) -> str:
+    """
+    Rantai preprocess langkah demi langkah (referensi). Hasilnya harus
+    identik dengan preprocess_input_text; lihat app/tools/bench_preprocess.py
+    """
     text = content if isinstance(content, str) else ""
     text = strip_tempo_prefix(text)
     text = remove_info_prefix(text)
@@ -149,45 +302,98 @@ def preprocess_input_text(content: str) -> str:
     text = fix_punct_spacing_strict(text)
     text = rapikan_singkatan(text)
     text = fix_spacing(text)
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _WHITESPACE_RE.sub(' ', text).strip()
     return text
 
+def preprocess_input_text(content: str) -> str:
+    """
+    Versi gabungan dari preprocess_input_text_chain dengan hasil yang
+    sama persis, tapi teks panjang hanya di-scan 8 kali, bukan ~16:
+    - langkah awal (prefix, dash, huruf pertama) hanya menyentuh awal teks
+    - 4 pola boilerplate "potong sampai akhir baris" jadi satu alternasi
+    - rapikan_singkatan dijalankan sebelum spasi diringkas; \s* di
+      polanya sudah menelan spasi apa pun, jadi hasilnya sama
+    - semua aturan "hapus spasi sebelum . , ! ? ; : ) \" ”" jadi satu
+      pass, lalu spasi diringkas sekali; strip & ringkas ulang di akhir
+      rantai lama tidak lagi mengubah apa pun
+    """
+    text = content if isinstance(content, str) else ""
+    text = strip_tempo_prefix(text)
+    text = remove_info_prefix(text)
+    text = remove_leading_dash(text)
+    text = fix_first_word_glue_and_caps(text)
+    text = normalize_first_words(text)
+    text = _STRAY_LETTER_RE.sub('', text)
+    text = _BOILERPLATE_TAIL_RE.sub('', text)
+    text = _BOILERPLATE_PATTERNS[-1].sub('', text)
+    text = _PAREN_WORD_RE.sub(r'(\1)', text)
+    text = _SPACE_BEFORE_ANY_PUNCT_RE.sub('', text)
+    text = _WHITESPACE_RE.sub(' ', text)
+    text = _QUOTE_BEFORE_LETTER_RE.sub(r'\1 ', text)
+    return text.strip()
+
 def truncate_to_max_tokens(text: str, max_tokens: int = MAX_INPUT_TOKENS) -> str:
     """
     Memotong teks supaya tidak lebih dari max_tokens
     """
     if not text:
         return text
-    encoded = tokenizer.encode(text, truncation=True, max_length=max_tokens)
-    return tokenizer.decode(encoded, skip_special_tokens=True)
-
-def generate_highlight_from_text(
-    content: str,
-    max_length: int = 75,
-    min_length: int = 30,
-    no_repeat_ngram_size: int = 2
-) -> str:
+    m = get_model()
+    with m.tokenizer_lock:
+        encoded = m.tokenizer.encode(text, truncation=True, max_length=max_tokens)
+        return m.tokenizer.decode(encoded, skip_special_tokens=True)
 
-    # 1. Preprocess sesuai pola training
-    text = preprocess_input_text(content)
-    if not text:
-        return ""
-
-    # 2. Batasi panjang input
-    text = truncate_to_max_tokens(text, MAX_INPUT_TOKENS)
+def encode_texts(
+    tokenizer,
+    texts: List[str],
+    prefix: str = "",
+    max_tokens: Optional[int] = MAX_INPUT_TOKENS,
+    add_special_tokens: bool = True
+) -> List[List[int]]:
+    """
+    Satu-satunya jalur teks -> input_ids model (API, artikel panjang,
+    app/tools/dataset.py). Teks yang menghasilkan <unk> melewati jalur lama
+    (encode -> decode(skip_special_tokens=True) -> encode ulang) supaya
+    <unk> dibuang persis seperti dulu; teks lain cukup ditokenisasi sekali.
+    max_tokens None = tanpa pemotongan. Pemanggil memegang tokenizer_lock.
+    """
+    truncation = max_tokens is not None
+    batch = tokenizer(
+        [prefix + t for t in texts], truncation=truncation, max_length=max_tokens,
+        add_special_tokens=add_special_tokens
+    )["input_ids"]
+    unk = tokenizer.unk_token_id
+    if unk is None:
+        return batch
+    for i, ids in enumerate(batch):
+        if unk in ids:
+            cleaned = tokenizer.decode(
+                tokenizer.encode(texts[i], truncation=truncation, max_length=max_tokens), skip_special_tokens=True
+            )
+            batch[i] = tokenizer.encode(
+                prefix + cleaned, truncation=truncation, max_length=max_tokens, add_special_tokens=add_special_tokens
+            )
+    return batch
 
-    # 3. Panggil model IndoT5 via pipeline
-    result = summarizer(
-        text,
-        max_new_tokens=max_length,
-        min_length=min_length,
-        no_repeat_ngram_size=no_repeat_ngram_size,
-        do_sample=False,
-    )
+def encode_input(
+    text: str,
+    max_tokens: int = MAX_INPUT_TOKENS,
+    model: Optional[LoadedModel] = None,
+    timings: Optional[Dict[str, float]] = None
+) -> List[int]:
+    """
+    Tokenisasi sekali (termasuk prefix tugas dari pipeline) lalu potong
+    ke max_tokens. input_ids ini langsung dipakai generate(), tanpa
+    decode lalu tokenisasi ulang seperti truncate_to_max_tokens
+    """
+    m = model or get_model()
+    with metrics.timed("tokenize", timings), m.tokenizer_lock:
+        return encode_texts(m.tokenizer, [text], m.prefix, max_tokens)[0]
 
-    summary_text = result[0]["summary_text"].strip()
+def postprocess_summary(summary_text: str) -> str:
+    summary_text = summary_text.strip()
 
-    # 5. Filter kalimat 
+    # Filter kalimat 
     sentences = summary_text.split(".")
     clean_sentences = []
 
@@ -220,3 +426,776 @@ def generate_highlight_from_text(
     highlight = fix_spacing(highlight)
 
     return highlight
+
+#   DEADLINE
+class DeadlineExceeded(TimeoutError):
+    """
+    Batas waktu request terlampaui. `partial` berisi highlight dari token
+    yang sempat di-generate (bisa kosong jika belum sempat generate)
+    """
+
+    def __init__(self, partial: str = ""):
+        super().__init__("Batas waktu request terlampaui")
+        self.partial = partial
+
+def resolve_deadline(timeout: Optional[float]) -> Optional[float]:
+    """
+    Timeout dari client (detik) -> deadline time.monotonic(), dibatasi
+    MAX_REQUEST_TIMEOUT. None = pakai REQUEST_TIMEOUT
+    """
+    if timeout is None:
+        timeout = REQUEST_TIMEOUT
+    if MAX_REQUEST_TIMEOUT > 0 and (timeout <= 0 or timeout > MAX_REQUEST_TIMEOUT):
+        timeout = MAX_REQUEST_TIMEOUT
+    return time.monotonic() + timeout if timeout > 0 else None
+
+def deadline_passed(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+def _deadline_criteria(deadlines: List[Optional[float]]):
+    """
+    StoppingCriteria per baris: baris milik request yang deadline-nya
+    lewat dihentikan, baris lain tetap lanjut. Dipanggil tiap langkah
+    decode dengan batch * num_beams baris.
+    """
+    import torch
+    from transformers import StoppingCriteria
+
+    class _DeadlineCriteria(StoppingCriteria):
+        def __init__(self):
+            self.expired = [False] * len(deadlines)
+
+        def __call__(self, input_ids, scores, **kwargs):
+            now = time.monotonic()
+            for i, deadline in enumerate(deadlines):
+                if deadline is not None and now >= deadline:
+                    self.expired[i] = True
+            per_item = input_ids.shape[0] // len(deadlines)
+            hits = torch.tensor(self.expired, dtype=torch.bool, device=input_ids.device)
+            return hits.repeat_interleave(per_item)
+
+    return _DeadlineCriteria()
+
+def _encoder_outputs(
+    m: LoadedModel,
+    batch_ids: List[List[int]],
+    attention_mask,
+    decoding: str,
+    timings: Optional[Dict[str, float]] = None
+) -> dict:
+    """
+    kwargs encoder_outputs untuk generate() dari encoder_cache: hanya
+    baris yang belum ada di cache yang dilewatkan ke encoder. Kosong
+    (generate menjalankan encoder sendiri) untuk backend selain torch,
+    decoding assisted (draft model butuh encoder sendiri) atau cache mati.
+    """
+    if not encoder_cache.enabled or m.backend != "torch" or decoding == "assisted":
+        return {}
+
+    import torch
+    from transformers.modeling_outputs import BaseModelOutput
+
+    keys = [encoder_cache_key(m.model_id, ids) for ids in batch_ids]
+    hidden = [encoder_cache.get(key) for key in keys]
+    missing = [i for i, h in enumerate(hidden) if h is None]
+    if missing:
+        width = max(len(batch_ids[i]) for i in missing)
+        miss_ids = torch.full((len(missing), width), m.tokenizer.pad_token_id, dtype=torch.long)
+        miss_mask = torch.zeros((len(missing), width), dtype=torch.long)
+        for row, i in enumerate(missing):
+            miss_ids[row, :len(batch_ids[i])] = torch.tensor(batch_ids[i], dtype=torch.long)
+            miss_mask[row, :len(batch_ids[i])] = 1
+        with metrics.timed("encode", timings), torch.inference_mode():
+            states = m.model.get_encoder()(input_ids=miss_ids, attention_mask=miss_mask).last_hidden_state
+        for row, i in enumerate(missing):
+            # clone: slice tanpa padding, tidak menahan tensor batch di memori
+            hidden[i] = states[row, :len(batch_ids[i])].clone()
+            encoder_cache.set(keys[i], hidden[i])
+
+    # Posisi padding di-mask lewat attention_mask, jadi cukup diisi nol
+    states = hidden[0].new_zeros((len(batch_ids), attention_mask.shape[1], hidden[0].shape[-1]))
+    for i, h in enumerate(hidden):
+        states[i, :h.shape[0]] = h
+    return {"encoder_outputs": BaseModelOutput(last_hidden_state=states)}
+
+def summarize_ids(
+    batch_ids: List[List[int]],
+    max_length: int = 75,
+    min_length: int = 30,
+    no_repeat_ngram_size: int = 2,
+    model: Optional[LoadedModel] = None,
+    timings: Optional[Dict[str, float]] = None,
+    deadlines: Optional[List[Optional[float]]] = None,
+    expired: Optional[List[bool]] = None,
+    decoding: str = "beam",
+    use_encoder_cache: bool = True
+) -> List[str]:
+    """
+    Satu generate() ber-padding untuk beberapa input hasil encode_input.
+    deadlines (per input) menghentikan generate baris yang kehabisan
+    waktu; baris yang terpotong karenanya ditandai True di `expired`.
+    decoding: salah satu DECODING_MODES (app/services/decoding.py).
+    use_encoder_cache=False: encoder_cache tidak dibaca maupun diisi.
+    """
+    if not batch_ids:
+        return []
+
+    if decoding in SPECULATIVE_MODES and len(batch_ids) > 1:
+        # Decoding spekulatif di transformers hanya mendukung satu baris
+        summaries: List[str] = []
+        flags: List[bool] = []
+        for i, ids in enumerate(batch_ids):
+            row_expired: List[bool] = []
+            summaries += summarize_ids(
+                [ids], max_length, min_length, no_repeat_ngram_size, model=model, timings=timings,
+                deadlines=deadlines[i:i + 1] if deadlines else None, expired=row_expired, decoding=decoding,
+                use_encoder_cache=use_encoder_cache
+            )
+            flags += row_expired
+        if expired is not None:
+            expired[:] = flags
+        return summaries
+
+    import torch
+
+    m = model or get_model()
+    extra_kwargs = decoding_kwargs(decoding, m.model, get_draft_model(m) if decoding == "assisted" else None)
+    criteria = None
+    if deadlines and any(d is not None for d in deadlines):
+        criteria = _deadline_criteria(deadlines)
+
+    # Padding kanan manual seperti tokenizer T5, tanpa lewat tokenizer lagi
+    width = max(len(ids) for ids in batch_ids)
+    input_ids = torch.full((len(batch_ids), width), m.tokenizer.pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(batch_ids), width), dtype=torch.long)
+    for i, ids in enumerate(batch_ids):
+        input_ids[i, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+        attention_mask[i, :len(ids)] = 1
+
+    metrics.BATCH_SIZE.observe(len(batch_ids))
+    for ids in batch_ids:
+        metrics.INPUT_TOKENS.observe(len(ids))
+    if use_encoder_cache:
+        extra_kwargs.update(_encoder_outputs(m, batch_ids, attention_mask, decoding, timings))
+
+    with metrics.timed("generate", timings), torch.inference_mode():
+        output_ids = m.model.generate(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            generation_config=m.generation_config,
+            max_new_tokens=max_length,
+            min_length=min_length,
+            no_repeat_ngram_size=no_repeat_ngram_size,
+            do_sample=False,
+            stopping_criteria=[criteria] if criteria else None,
+            **extra_kwargs,
+        )
+
+    for n in (output_ids != m.tokenizer.pad_token_id).sum(dim=1).tolist():
+        metrics.OUTPUT_TOKENS.observe(n)
+
+    if expired is not None:
+        # Baris yang sudah selesai (ada EOS) sebelum deadline tetap utuh
+        eos = m.tokenizer.eos_token_id
+        expired[:] = [
+            bool(criteria and criteria.expired[i] and eos not in row)
+            for i, row in enumerate(output_ids.tolist())
+        ]
+
+    with metrics.timed("postprocess", timings):
+        with m.tokenizer_lock:
+            summaries = m.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+        return [postprocess_summary(s) for s in summaries]
+
+def generate_highlight_from_text(
+    content: str,
+    max_length: int = 75,
+    min_length: int = 30,
+    no_repeat_ngram_size: int = 2,
+    model_name: Optional[str] = None,
+    deadline: Optional[float] = None,
+    decoding: Optional[str] = None
+) -> str:
+
+    decoding = resolve_decoding(decoding)
+    # 1. Preprocess sesuai pola training
+    with metrics.timed("preprocess"):
+        text = preprocess_input_text(content)
+    if not text:
+        return ""
+
+    m = get_model(model_name)
+    cached, cache_key = lookup_highlight(text, m, max_length, min_length, no_repeat_ngram_size, decoding)
+    if cached is not None:
+        return cached
+
+    # 2. Tokenisasi sekali & batasi panjang input
+    input_ids = encode_input(text, MAX_INPUT_TOKENS, model=m)
+
+    # 3. Panggil model IndoT5 + filter kalimat
+    expired: List[bool] = []
+    highlight = summarize_ids(
+        [input_ids], max_length, min_length, no_repeat_ngram_size,
+        model=m, deadlines=[deadline], expired=expired, decoding=decoding
+    )[0]
+    if expired[0]:
+        raise DeadlineExceeded(highlight)
+    remember_highlight(cache_key, highlight)
+    return highlight
+
+def generate_highlights_batch(
+    items: List[Tuple[str, int, int, int, Optional[str]]],
+    batch_size: int = BATCH_MAX_SIZE,
+    timings: Optional[Dict[str, float]] = None,
+    deadline: Optional[float] = None,
+    decoding: Optional[str] = None
+) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    items: (content, max_length, min_length, no_repeat_ngram_size, model_name).
+    Hasil (highlight, error) per item, urut sesuai input. Item diurutkan
+    per model & parameter lalu per panjang token supaya padding tiap batch minim.
+    Item yang terpotong deadline berisi highlight parsial + error.
+    """
+    decoding = resolve_decoding(decoding)
+    results: List[Tuple[Optional[str], Optional[str]]] = [(None, None)] * len(items)
+    prepared = []
+
+    for idx, (content, max_length, min_length, no_repeat_ngram_size, model_name) in enumerate(items):
+        try:
+            with metrics.timed("preprocess", timings):
+                text = preprocess_input_text(content)
+            if not text:
+                results[idx] = ("", None)
+                continue
+            model_name = model_pool.resolve(model_name)
+            m = get_model(model_name)
+            cached, cache_key = lookup_highlight(text, m, max_length, min_length, no_repeat_ngram_size, decoding)
+            if cached is not None:
+                results[idx] = (cached, None)
+                continue
+            input_ids = encode_input(text, MAX_INPUT_TOKENS, model=m, timings=timings)
+        except Exception as e:
+            results[idx] = (None, str(e))
+            continue
+        prepared.append(((model_name, max_length, min_length, no_repeat_ngram_size), idx, input_ids, cache_key))
+
+    prepared.sort(key=lambda p: (p[0], len(p[2])))
+
+    start = 0
+    while start < len(prepared):
+        params = prepared[start][0]
+        end = start
+        while end < len(prepared) and end - start < batch_size and prepared[end][0] == params:
+            end += 1
+
+        chunk = prepared[start:end]
+        if deadline_passed(deadline):
+            for p in chunk:
+                results[p[1]] = (None, str(DeadlineExceeded()))
+            start = end
+            continue
+        try:
+            model_name, max_length, min_length, no_repeat_ngram_size = params
+            expired: List[bool] = []
+            highlights = summarize_ids(
+                [p[2] for p in chunk], max_length, min_length, no_repeat_ngram_size,
+                model=get_model(model_name), timings=timings,
+                deadlines=[deadline] * len(chunk), expired=expired, decoding=decoding
+            )
+            for p, highlight, cut in zip(chunk, highlights, expired):
+                if cut:
+                    results[p[1]] = (highlight, str(DeadlineExceeded()))
+                    continue
+                results[p[1]] = (highlight, None)
+                remember_highlight(p[3], highlight)
+        except Exception as e:
+            for p in chunk:
+                results[p[1]] = (None, str(e))
+        start = end
+
+    return results
+
+def split_token_windows(
+    ids: List[int],
+    window: int,
+    overlap: int,
+    max_chunks: int
+) -> List[List[int]]:
+    """
+    Memecah token menjadi jendela sepanjang `window` yang saling tumpang
+    tindih `overlap` token, paling banyak `max_chunks` jendela
+    """
+    stride = max(1, window - overlap)
+    chunks = []
+    for start in range(0, max(1, len(ids)), stride):
+        chunks.append(ids[start:start + window])
+        if start + window >= len(ids) or len(chunks) >= max_chunks:
+            break
+    return chunks
+
+def generate_long_highlight(
+    content: str,
+    max_length: int = 75,
+    min_length: int = 30,
+    no_repeat_ngram_size: int = 2,
+    chunk_tokens: int = LONG_DOC_CHUNK_TOKENS,
+    chunk_overlap: int = LONG_DOC_OVERLAP,
+    max_chunks: int = LONG_DOC_MAX_CHUNKS,
+    timings: Optional[Dict[str, float]] = None,
+    model_name: Optional[str] = None,
+    deadline: Optional[float] = None,
+    decoding: Optional[str] = None
+) -> str:
+    """
+    Highlight untuk artikel yang lebih panjang dari MAX_INPUT_TOKENS:
+    1. map   : artikel dipecah jadi jendela token yang tumpang tindih,
+               semua jendela diringkas dalam satu generate ber-batch
+    2. reduce: gabungan ringkasan jendela diringkas sekali lagi
+    Artikel yang muat dalam satu jendela diproses seperti biasa. Jika
+    deadline lewat di tahap map, ringkasan jendela yang sudah ada
+    dikembalikan sebagai hasil parsial lewat DeadlineExceeded.
+    """
+    with metrics.timed("preprocess", timings):
+        text = preprocess_input_text(content)
+    if not text:
+        return ""
+
+    decoding = resolve_decoding(decoding)
+    m = get_model(model_name)
+    cached, cache_key = lookup_highlight(
+        text, m, max_length, min_length, no_repeat_ngram_size, decoding,
+        "long", chunk_tokens, chunk_overlap, max_chunks
+    )
+    if cached is not None:
+        return cached
+
+    with metrics.timed("tokenize", timings), m.tokenizer_lock:
+        prefix_ids, body_ids = encode_texts(m.tokenizer, [m.prefix, text], max_tokens=None, add_special_tokens=False)
+    eos = [m.tokenizer.eos_token_id] if m.tokenizer.eos_token_id is not None else []
+
+    window = min(chunk_tokens, MAX_INPUT_TOKENS) - len(prefix_ids) - len(eos)
+    expired: List[bool] = []
+    if len(body_ids) <= window:
+        highlight = summarize_ids(
+            [prefix_ids + body_ids + eos], max_length, min_length, no_repeat_ngram_size,
+            model=m, timings=timings, deadlines=[deadline], expired=expired, decoding=decoding
+        )[0]
+    else:
+        chunks = split_token_windows(body_ids, window, min(chunk_overlap, window - 1), max_chunks)
+
+        # 1. Map: semua jendela dalam batch (maks BATCH_MAX_SIZE per generate)
+        chunk_summaries: List[str] = []
+        batch = [prefix_ids + c + eos for c in chunks]
+        for i in range(0, len(batch), BATCH_MAX_SIZE):
+            part = batch[i:i + BATCH_MAX_SIZE]
+            if deadline_passed(deadline):
+                raise DeadlineExceeded(" ".join(s for s in chunk_summaries if s))
+            chunk_summaries.extend(
+                summarize_ids(
+                    part, max_length, min_length, no_repeat_ngram_size,
+                    model=m, timings=timings, deadlines=[deadline] * len(part), expired=expired,
+                    decoding=decoding
+                )
+            )
+            if any(expired):
+                raise DeadlineExceeded(" ".join(s for s in chunk_summaries if s))
+
+        # 2. Reduce: ringkas ulang gabungan ringkasan jendela
+        merged = " ".join(s for s in chunk_summaries if s)
+        if deadline_passed(deadline):
+            raise DeadlineExceeded(merged)
+        highlight = summarize_ids(
+            [encode_input(merged, MAX_INPUT_TOKENS, model=m, timings=timings)],
+            max_length, min_length, no_repeat_ngram_size,
+            model=m, timings=timings, deadlines=[deadline], expired=expired, decoding=decoding
+        )[0]
+
+    if any(expired):
+        raise DeadlineExceeded(highlight)
+    remember_highlight(cache_key, highlight)
+    return highlight
+
+def generate_streaming(
+    input_ids: List[int],
+    on_text: Callable[[str], None],
+    max_length: int = 75,
+    min_length: int = 30,
+    no_repeat_ngram_size: int = 2,
+    model: Optional[LoadedModel] = None,
+    deadline: Optional[float] = None,
+    expired: Optional[List[bool]] = None,
+    decoding: str = "greedy"
+) -> str:
+    """
+    Generate satu artikel sambil memanggil on_text untuk setiap potongan
+    teks yang sudah final. Streamer tidak mendukung beam search, jadi
+    mode ini selalu greedy (num_beams=1), boleh dipercepat dengan
+    prompt_lookup / assisted. Mengembalikan ringkasan mentah.
+    """
+    import torch
+    from transformers import TextStreamer
+
+    m = model or get_model()
+    if decoding not in SPECULATIVE_MODES:
+        decoding = "greedy"
+    extra_kwargs = decoding_kwargs(decoding, m.model, get_draft_model(m) if decoding == "assisted" else None)
+
+    class _Streamer(TextStreamer):
+        # decode() dipanggil dari thread generate, jadi tetap lewat lock
+        def put(self, value):
+            with m.tokenizer_lock:
+                super().put(value)
+
+        def end(self):
+            with m.tokenizer_lock:
+                super().end()
+
+        def on_finalized_text(self, text: str, stream_end: bool = False):
+            if text:
+                on_text(text)
+
+    streamer = _Streamer(m.tokenizer, skip_prompt=True, skip_special_tokens=True)
+    ids = torch.tensor([input_ids], dtype=torch.long)
+    attention_mask = torch.ones_like(ids)
+    criteria = _deadline_criteria([deadline]) if deadline is not None else None
+    extra_kwargs.update(_encoder_outputs(m, [input_ids], attention_mask, decoding))
+
+    with torch.inference_mode():
+        output_ids = m.model.generate(
+            input_ids=ids,
+            attention_mask=attention_mask,
+            generation_config=m.generation_config,
+            max_new_tokens=max_length,
+            min_length=min_length,
+            no_repeat_ngram_size=no_repeat_ngram_size,
+            do_sample=False,
+            streamer=streamer,
+            stopping_criteria=[criteria] if criteria else None,
+            **extra_kwargs,
+        )
+
+    if expired is not None:
+        expired[:] = [bool(criteria and criteria.expired[0] and m.tokenizer.eos_token_id not in output_ids[0].tolist())]
+    with m.tokenizer_lock:
+        return m.tokenizer.decode(output_ids[0], skip_special_tokens=True)
+
+def stream_highlight_from_text(
+    content: str,
+    on_text: Callable[[str], None],
+    max_length: int = 75,
+    min_length: int = 30,
+    no_repeat_ngram_size: int = 2,
+    model_name: Optional[str] = None,
+    deadline: Optional[float] = None,
+    decoding: Optional[str] = None
+) -> str:
+    """
+    Versi streaming generate_highlight_from_text: token dikirim lewat
+    on_text, hasil akhir sudah melalui filter kalimat. Jika highlight
+    ada di cache, langsung dikembalikan tanpa streaming token.
+    """
+    with metrics.timed("preprocess"):
+        text = preprocess_input_text(content)
+    if not text:
+        return ""
+
+    # Cache dicari & diisi dengan decoding yang benar-benar dijalankan
+    # generate_streaming (beam selalu jadi greedy)
+    decoding = resolve_decoding(decoding)
+    if decoding not in SPECULATIVE_MODES:
+        decoding = "greedy"
+    m = get_model(model_name)
+    cached, cache_key = lookup_highlight(text, m, max_length, min_length, no_repeat_ngram_size, decoding)
+    if cached is not None:
+        return cached
+
+    if deadline_passed(deadline):
+        raise DeadlineExceeded()
+    input_ids = encode_input(text, MAX_INPUT_TOKENS, model=m)
+    expired: List[bool] = []
+    with metrics.timed("generate"):
+        summary = generate_streaming(
+            input_ids, on_text, max_length, min_length, no_repeat_ngram_size,
+            model=m, deadline=deadline, expired=expired, decoding=decoding
+        )
+    with metrics.timed("postprocess"):
+        highlight = postprocess_summary(summary)
+    if expired[0]:
+        raise DeadlineExceeded(highlight)
+    remember_highlight(cache_key, highlight)
+    return highlight
+
+def warmup_model(lengths: List[int] = WARMUP_LENGTHS):
+    """
+    Generate dummy di beberapa panjang input supaya kernel & alokator
+    sudah siap sebelum request pertama masuk
+    """
+    m = get_model()
+    with m.tokenizer_lock:
+        unit = m.tokenizer.encode(
+            "Majelis hakim menjatuhkan vonis kepada terdakwa kasus korupsi dana desa.",
+            add_special_tokens=False
+        )
+    eos = [m.tokenizer.eos_token_id] if m.tokenizer.eos_token_id is not None else []
+
+    for i, n in enumerate(lengths):
+        ids = (unit * (n // max(1, len(unit)) + 1))[:max(1, n - len(eos))] + eos
+        # Panjang pertama juga dijalankan dalam bentuk batch penuh
+        batch = [ids] * (BATCH_MAX_SIZE if i == 0 else 1)
+        # Input dummy tidak akan pernah dipakai request asli; jangan ambil jatah encoder_cache
+        summarize_ids(batch, use_encoder_cache=False)
+
+def prepare_model():
+    """
+    Dipanggil saat startup aplikasi: muat model lalu warmup. /ready
+    baru mengembalikan 200 setelah fungsi ini selesai.
+    """
+    model_registry.warming = True
+    try:
+        model_registry.load()
+        warmup_model()
+    except Exception as e:
+        model_registry.error = str(e)
+    finally:
+        model_registry.warming = False
+
+#   MICRO-BATCHING SCHEDULER
+class InferenceQueueFull(RuntimeError):
+    pass
+
+class _PendingHighlight:
+    __slots__ = ("input_ids", "key", "cache_key", "call", "timings", "deadline", "future", "enqueued_at")
+
+    def __init__(
+        self,
+        input_ids: List[int],
+        key: Optional[Tuple[str, str, int, int, int, int]],
+        cache_key: Optional[HighlightKey] = None,
+        call: Optional[Callable] = None,
+        timings: Optional[Dict[str, float]] = None,
+        deadline: Optional[float] = None
+    ):
+        self.input_ids = input_ids
+        self.key = key
+        self.cache_key = cache_key
+        # Job generik (mis. batch endpoint) jalan sendiri tanpa digabung
+        self.call = call
+        self.timings = timings
+        self.deadline = deadline
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+def _completed(value) -> Future:
+    done: Future = Future()
+    done.set_result(value)
+    return done
+
+class HighlightBatcher:
+    """
+    Mengantrekan artikel masuk dan menggabungkan yang kompatibel
+    (parameter generate sama, panjang token mirip) menjadi satu batch.
+    Batch dijalankan begitu penuh atau jendela tunggu habis, jadi
+    tambahan latensi paling lama max_wait_ms.
+
+    Generate berjalan di `workers` thread milik batcher sendiri. Antrean
+    dibatasi `max_queue_size`; jika penuh, submit() langsung menolak
+    dengan InferenceQueueFull supaya request tidak menumpuk tanpa batas.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_WAIT_MS,
+        length_bucket: int = BATCH_LENGTH_BUCKET,
+        workers: int = INFERENCE_WORKERS,
+        max_queue_size: int = INFERENCE_QUEUE_SIZE
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.length_bucket = max(1, length_bucket)
+        self.workers = max(1, workers)
+        self.max_queue_size = max_queue_size
+        self.in_flight = 0
+        self._pending: Deque[_PendingHighlight] = deque()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def submit(
+        self,
+        content: str,
+        max_length: int = 75,
+        min_length: int = 30,
+        no_repeat_ngram_size: int = 2,
+        timings: Optional[Dict[str, float]] = None,
+        model_name: Optional[str] = None,
+        deadline: Optional[float] = None,
+        decoding: Optional[str] = None
+    ) -> Future:
+        """
+        timings (opsional) diisi durasi per tahap (preprocess, tokenize,
+        queue, generate, postprocess) untuk header Server-Timing.
+        Hanya request untuk model yang sama yang digabung dalam satu batch.
+        Lewat deadline, future gagal dengan DeadlineExceeded.
+        """
+        model_name = model_pool.resolve(model_name)
+        decoding = resolve_decoding(decoding)
+        with metrics.timed("preprocess", timings):
+            text = preprocess_input_text(content)
+        if not text:
+            return _completed("")
+
+        m = get_model(model_name)
+        cached, cache_key = lookup_highlight(text, m, max_length, min_length, no_repeat_ngram_size, decoding)
+        if cached is not None:
+            return _completed(cached)
+
+        input_ids = encode_input(text, MAX_INPUT_TOKENS, model=m, timings=timings)
+        key = (
+            model_name, decoding, max_length, min_length, no_repeat_ngram_size,
+            len(input_ids) // self.length_bucket
+        )
+        return self._enqueue(_PendingHighlight(input_ids, key, cache_key, timings=timings, deadline=deadline))
+
+    def submit_call(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Menjalankan fn di worker inference (ikut batas antrean & konkurensi
+        yang sama dengan /highlight), tanpa digabung dengan request lain
+        """
+        return self._enqueue(_PendingHighlight([], None, call=lambda: fn(*args, **kwargs)))
+
+    def _enqueue(self, item: _PendingHighlight) -> Future:
+        with self._cond:
+            if self.max_queue_size > 0 and len(self._pending) >= self.max_queue_size:
+                raise InferenceQueueFull("Antrean inference penuh")
+            self._ensure_workers()
+            self._pending.append(item)
+            self._cond.notify()
+        return item.future
+
+    def _ensure_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            t = threading.Thread(
+                target=self._run,
+                name=f"highlight-worker-{len(self._threads)}",
+                daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+    def _take_batch(self) -> List[_PendingHighlight]:
+        with self._cond:
+            while True:
+                while not self._pending:
+                    self._cond.wait()
+
+                # Head bisa sudah diambil worker lain selama menunggu,
+                # jadi kunci batch dihitung ulang setiap bangun
+                head = self._pending[0]
+                if head.call is not None:
+                    batch = [head]
+                    break
+                # Decoding spekulatif tidak bisa di-batch, jadi jalan satu per satu
+                limit = 1 if head.key[1] in SPECULATIVE_MODES else self.max_batch_size
+                batch = [p for p in self._pending if p.key == head.key][:limit]
+                remaining = head.enqueued_at + self.max_wait - time.monotonic()
+                if len(batch) >= limit or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            for p in batch:
+                self._pending.remove(p)
+            self.in_flight += len(batch)
+            if self._pending:
+                self._cond.notify()
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                self._run_batch(batch)
+            finally:
+                with self._cond:
+                    self.in_flight -= len(batch)
+
+    def _run_batch(self, batch: List[_PendingHighlight]):
+        # Request yang sudah dibatalkan (client putus) tidak ikut generate
+        batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        now = time.monotonic()
+        for p in batch:
+            waited = now - p.enqueued_at
+            metrics.STAGE_SECONDS.observe(waited, stage="queue")
+            if p.timings is not None:
+                p.timings["queue"] = waited
+
+        if batch[0].call is not None:
+            job = batch[0]
+            try:
+                job.future.set_result(job.call())
+            except Exception as e:
+                job.future.set_exception(e)
+            return
+
+        # Request yang sudah lewat deadline selama antre tidak ikut generate
+        late = [p for p in batch if deadline_passed(p.deadline)]
+        for p in late:
+            p.future.set_exception(DeadlineExceeded())
+        batch = [p for p in batch if p not in late]
+        if not batch:
+            return
+
+        model_name, decoding, max_length, min_length, no_repeat_ngram_size, _ = batch[0].key
+        # generate & postprocess dipakai bersama oleh seluruh batch
+        shared: Dict[str, float] = {}
+        expired: List[bool] = []
+        try:
+            highlights = summarize_ids(
+                [p.input_ids for p in batch],
+                max_length=max_length,
+                min_length=min_length,
+                no_repeat_ngram_size=no_repeat_ngram_size,
+                model=get_model(model_name),
+                timings=shared,
+                deadlines=[p.deadline for p in batch],
+                expired=expired,
+                decoding=decoding,
+            )
+        except Exception as e:
+            for p in batch:
+                p.future.set_exception(e)
+            return
+
+        for p, highlight, cut in zip(batch, highlights, expired):
+            if p.timings is not None:
+                p.timings.update(shared)
+            if cut:
+                # Hasil parsial tidak disimpan ke cache
+                p.future.set_exception(DeadlineExceeded(highlight))
+                continue
+            remember_highlight(p.cache_key, highlight)
+            p.future.set_result(highlight)
+
+batcher = HighlightBatcher()
+
+metrics.registry.gauge("highlight_queue_depth", "Jumlah request yang menunggu di antrean inference",
+                       lambda: batcher.queue_depth)
+metrics.registry.gauge("highlight_inflight_requests", "Jumlah request yang sedang di-generate",
+                       lambda: batcher.in_flight)
+metrics.registry.gauge("highlight_model_ready", "1 jika model sudah dimuat dan warmup selesai",
+                       lambda: int(model_registry.ready))
+metrics.registry.gauge("highlight_model_load_seconds", "Durasi load model terakhir (detik)",
+                       lambda: model_registry.load_seconds)
+metrics.registry.gauge("highlight_models_loaded", "Jumlah model yang sedang dimuat",
+                       lambda: sum(s["loaded"] for s in model_pool.status().values()))
+metrics.registry.gauge("highlight_model_memory_bytes", "Perkiraan memori semua model yang dimuat",
+                       model_pool.memory_bytes)
+metrics.registry.gauge("highlight_model_evictions_total", "Jumlah model yang dilepas karena batas memori",
+                       lambda: model_pool.evictions, kind="counter")
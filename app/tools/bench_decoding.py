@@ -0,0 +1,145 @@
+"""
+Bandingkan mode decoding pada batch size 1 (pola request tunggal /highlight).
+
+    python -m app.tools.bench_decoding --input news_tempo_hukum_last3y.csv
+    python -m app.tools.bench_decoding --input news.csv --draft-model models/finetuned_small --modes greedy,assisted
+
+Setiap artikel di-generate sekali per mode. Laporan JSON berisi latensi
+p50/p95, token output per detik dan speedup terhadap greedy. greedy,
+prompt_lookup dan assisted harus menghasilkan highlight yang identik
+(decoding spekulatif hanya mempercepat, tidak mengubah hasil); jika ada
+yang berbeda, contoh perbedaannya dilaporkan dan exit code 1. beam
+diukur untuk perbandingan kecepatan saja.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from app.services.decoding import DECODING_MODES
+from app.tools.benchmark import environment_info, percentile
+from app.tools.corpus import iter_records
+
+def run_mode(mode: str, batch_ids: List[List[int]], model, gen_kwargs: dict) -> dict:
+    from app.services import metrics
+    from app.services.cache_service import encoder_cache
+    from app.services.summarizer_service import summarize_ids
+
+    # Pemanasan: draft model / hook prompt lookup dimuat di luar pengukuran
+    summarize_ids(batch_ids[:1], model=model, decoding=mode, **gen_kwargs)
+    # Hidden state encoder dari mode sebelumnya / pemanasan tidak boleh dipakai ulang
+    encoder_cache.clear()
+
+    tokens_before, _ = metrics.OUTPUT_TOKENS.total()
+    highlights: List[str] = []
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for ids in batch_ids:
+        t0 = time.perf_counter()
+        highlights.extend(summarize_ids([ids], model=model, decoding=mode, **gen_kwargs))
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    tokens = metrics.OUTPUT_TOKENS.total()[0] - tokens_before
+
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "output_tokens": int(tokens),
+        "tokens_per_second": round(tokens / elapsed, 1) if elapsed else None,
+        "highlights": highlights,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan kecepatan & kesamaan hasil mode decoding.")
+    parser.add_argument("--input", required=True, help="CSV/JSONL berisi kolom content")
+    parser.add_argument("--model-path", help="Checkpoint target (default: HIGHLIGHT_MODEL_PATH)")
+    parser.add_argument("--draft-model", help="Checkpoint draft untuk mode assisted (tokenizer harus sama)")
+    parser.add_argument("--modes", default=None,
+                        help="Daftar mode dipisah koma (default: semua; assisted hanya jika ada draft model)")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--max-length", type=int, default=75)
+    parser.add_argument("--min-length", type=int, default=30)
+    parser.add_argument("--no-repeat-ngram-size", type=int, default=2)
+    parser.add_argument("--output", help="Tulis laporan JSON ke file ini (selain ke stdout)")
+    args = parser.parse_args(argv)
+
+    if args.model_path:
+        os.environ["HIGHLIGHT_MODEL_PATH"] = args.model_path
+    if args.draft_model:
+        os.environ["HIGHLIGHT_DRAFT_MODEL"] = args.draft_model
+    draft = os.getenv("HIGHLIGHT_DRAFT_MODEL")
+
+    if args.modes:
+        modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    else:
+        modes = [m for m in DECODING_MODES if m != "assisted" or draft]
+    unknown = [m for m in modes if m not in DECODING_MODES]
+    if unknown:
+        parser.error(f"Mode tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(DECODING_MODES)})")
+    if "assisted" in modes and not draft:
+        parser.error("Mode assisted butuh --draft-model atau HIGHLIGHT_DRAFT_MODEL")
+
+    # Import di sini supaya env model & draft dari argumen sudah berlaku
+    from app.services.summarizer_service import MAX_INPUT_TOKENS, encode_input, get_model, preprocess_input_text
+
+    texts = []
+    for record in itertools.islice(iter_records(args.input), args.limit):
+        text = preprocess_input_text(record.get("content", ""))
+        if text:
+            texts.append(text)
+    if not texts:
+        parser.error("Tidak ada artikel dengan content di input")
+
+    model = get_model()
+    batch_ids = [encode_input(t, MAX_INPUT_TOKENS, model=model) for t in texts]
+    gen_kwargs = {
+        "max_length": args.max_length,
+        "min_length": args.min_length,
+        "no_repeat_ngram_size": args.no_repeat_ngram_size,
+    }
+
+    runs: Dict[str, dict] = {mode: run_mode(mode, batch_ids, model, gen_kwargs) for mode in modes}
+
+    # Semua mode keluarga greedy dibandingkan dengan run greedy (atau mode pertama yang ada)
+    greedy_modes = [m for m in modes if m != "beam"]
+    reference = "greedy" if "greedy" in runs else (greedy_modes[0] if greedy_modes else None)
+    mismatches = []
+    for mode in greedy_modes:
+        if mode == reference:
+            continue
+        for i, (expected, got) in enumerate(zip(runs[reference]["highlights"], runs[mode]["highlights"])):
+            if expected != got:
+                mismatches.append({"mode": mode, "index": i, "expected": expected, "got": got})
+
+    base = runs.get("greedy")
+    for run in runs.values():
+        run["speedup_vs_greedy"] = round(base["seconds"] / run["seconds"], 2) if base and run["seconds"] else None
+        del run["highlights"]
+
+    report = {
+        "model_path": model.path,
+        "draft_model": draft if "assisted" in modes else None,
+        "articles": len(texts),
+        **gen_kwargs,
+        "modes": list(runs.values()),
+        "identical_to_greedy": not mismatches,
+        "mismatches": mismatches[:10],
+        "mismatch_count": len(mismatches),
+        "environment": environment_info(),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark + cek kesamaan preprocess_input_text.
+
+    python -m app.tools.bench_preprocess --golden
+    python -m app.tools.bench_preprocess --input news_tempo_hukum_last3y.csv
+    python -m app.tools.bench_preprocess --input news.csv --write-golden golden.jsonl
+
+Mode --input membandingkan engine gabungan dengan rantai langkah demi
+langkah pada korpus artikel asli. --write-golden menyimpan pasangan
+content/expected, dan --golden memastikan output saat ini masih sama
+byte demi byte dengan file tersebut. Exit code 1 jika ada perbedaan.
+
+--golden tanpa path memakai preprocess_golden.jsonl di folder ini:
+artikel Tempo asli dari model_development/preprocessing_data.ipynb
+(id = nomor baris di notebook), ditambah versi "+halaman" dengan awalan
+TEMPO.CO, kata pertama kapital, paragraf dan baris "Baca juga" seperti
+hasil scrape. Jalankan setelah mengubah langkah preprocess mana pun.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Callable, List
+
+from app.services.summarizer_service import preprocess_input_text, preprocess_input_text_chain
+from app.tools.corpus import iter_records
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "preprocess_golden.jsonl")
+
+def time_fn(fn: Callable[[str], str], texts: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark & cek kesamaan preprocess_input_text.")
+    parser.add_argument("--input", help="CSV/JSONL korpus artikel (kolom content)")
+    parser.add_argument("--golden", nargs="?", const=GOLDEN_PATH,
+                        help="JSONL golden (content, expected) untuk diverifikasi (default: preprocess_golden.jsonl)")
+    parser.add_argument("--write-golden", help="Tulis golden JSONL dari --input")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if not args.input and not args.golden:
+        parser.error("Butuh --input atau --golden")
+
+    if args.golden:
+        with open(args.golden, encoding="utf-8") as f:
+            golden = [json.loads(line) for line in f if line.strip()]
+        texts = [g["content"] for g in golden]
+        expected = [g["expected"] for g in golden]
+    else:
+        records = itertools.islice(iter_records(args.input), args.limit)
+        texts = [r.get("content", "") for r in records]
+        expected = [preprocess_input_text_chain(t) for t in texts]
+
+    mismatches = [i for i, (t, e) in enumerate(zip(texts, expected)) if preprocess_input_text(t) != e]
+
+    if args.write_golden:
+        with open(args.write_golden, "w", encoding="utf-8") as f:
+            for t, e in zip(texts, expected):
+                f.write(json.dumps({"content": t, "expected": e}, ensure_ascii=False) + "\n")
+
+    chain_seconds = time_fn(preprocess_input_text_chain, texts, args.repeat)
+    fused_seconds = time_fn(preprocess_input_text, texts, args.repeat)
+    report = {
+        "articles": len(texts),
+        "chars": sum(len(t) for t in texts),
+        "mismatches": len(mismatches),
+        "first_mismatch_index": mismatches[0] if mismatches else None,
+        "chain_seconds": chain_seconds,
+        "fused_seconds": fused_seconds,
+        "speedup": chain_seconds / fused_seconds if fused_seconds else None,
+    }
+    print(json.dumps(report, indent=2))
+
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
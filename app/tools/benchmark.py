@@ -0,0 +1,295 @@
+"""
+Benchmark beban & latensi layanan highlight.
+
+    python -m app.tools.benchmark --input news_tempo_hukum_last3y.csv --concurrency 1,4,16
+    python -m app.tools.benchmark --input news.csv --url http://127.0.0.1:8000 --server-pid 1234
+    python -m app.tools.benchmark --input news.csv --tiny-model /tmp/tiny_t5 --output bench.json
+
+Tanpa --url, aplikasi FastAPI dijalankan di proses yang sama lewat ASGI
+(cache highlight & encoder dimatikan supaya setiap request benar-benar generate).
+Dengan --url, request dikirim ke server uvicorn yang sedang berjalan.
+
+Setiap level konkurensi mengirim --requests request /highlight dan
+melaporkan throughput, latensi p50/p95/p99, token/detik (dari selisih
+/metrics) dan RSS puncak. --tiny-model membuat T5 acak kecil dengan
+tokenizer yang dilatih dari korpus, jadi benchmark bisa jalan offline
+tanpa checkpoint asli. Hasil dicetak sebagai JSON agar bisa di-diff
+antar rilis.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from app.tools.corpus import iter_records
+
+def _require_httpx():
+    try:
+        import httpx  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Benchmark membutuhkan httpx: pip install httpx") from e
+
+def build_tiny_model(out_dir: str, texts: List[str], vocab_size: int = 256, seed: int = 0) -> str:
+    """
+    T5 acak berukuran sangat kecil + tokenizer sentencepiece dari korpus.
+    Hasilnya tidak bermakna, tapi jalur inference-nya sama dengan model asli.
+    """
+    import sentencepiece as spm
+    import torch
+    from transformers import T5Config, T5ForConditionalGeneration, T5Tokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    if os.path.exists(os.path.join(out_dir, "config.json")):
+        return out_dir
+
+    corpus_path = os.path.join(out_dir, "corpus.txt")
+    with open(corpus_path, "w", encoding="utf-8") as f:
+        for t in texts:
+            f.write(t.replace("\n", " ") + "\n")
+    spm.SentencePieceTrainer.train(
+        input=corpus_path,
+        model_prefix=os.path.join(out_dir, "spiece"),
+        vocab_size=vocab_size,
+        hard_vocab_limit=False,
+        pad_id=0, eos_id=1, unk_id=2, bos_id=-1,
+        minloglevel=2,
+    )
+    os.remove(corpus_path)
+
+    tokenizer = T5Tokenizer(os.path.join(out_dir, "spiece.model"), extra_ids=0)
+    torch.manual_seed(seed)
+    config = T5Config(
+        vocab_size=len(tokenizer),
+        d_model=32, d_ff=64, d_kv=8, num_layers=2, num_heads=4,
+        pad_token_id=0, eos_token_id=1, decoder_start_token_id=0,
+    )
+    T5ForConditionalGeneration(config).save_pretrained(out_dir)
+    tokenizer.save_pretrained(out_dir)
+    os.remove(os.path.join(out_dir, "spiece.vocab"))
+    return out_dir
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Persentil dengan interpolasi linear (sama dengan numpy default)
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+_METRIC_RE = re.compile(r"^(highlight_(?:input|output)_tokens_(?:sum|count))\s+(\S+)$", re.M)
+
+async def scrape_token_counters(client) -> Dict[str, float]:
+    r = await client.get("/metrics")
+    if r.status_code != 200:
+        return {}
+    return {name: float(value) for name, value in _METRIC_RE.findall(r.text)}
+
+def peak_rss_mb(server_pid: Optional[int]) -> Optional[float]:
+    if server_pid is None:
+        # ru_maxrss dalam KB di Linux, byte di macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        with open(f"/proc/{server_pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+async def run_level(client, payloads: List[dict], concurrency: int, total: int) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = itertools.count()
+
+    async def worker():
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            start = time.perf_counter()
+            try:
+                r = await client.post("/highlight", json=payloads[i % len(payloads)])
+                status = str(r.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            if status == "200":
+                latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    before = await scrape_token_counters(client)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    after = await scrape_token_counters(client)
+
+    def delta(name: str) -> Optional[float]:
+        if name not in after:
+            return None
+        return after[name] - before.get(name, 0.0)
+
+    output_tokens = delta("highlight_output_tokens_sum")
+    input_tokens = delta("highlight_input_tokens_sum")
+    ok = len(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": ok,
+        "statuses": statuses,
+        "wall_seconds": wall,
+        "throughput_rps": ok / wall if wall else None,
+        "latency_mean": sum(latencies) / ok if ok else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies) if latencies else None,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "output_tokens_per_second": output_tokens / wall if output_tokens is not None and wall else None,
+    }
+
+def environment_info() -> dict:
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    for module in ("torch", "transformers", "onnxruntime"):
+        try:
+            info[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    try:
+        info["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+async def run_benchmark(args, payloads: List[dict]) -> dict:
+    import httpx
+
+    if args.url:
+        return await run_against(httpx.AsyncClient(base_url=args.url.rstrip("/"), timeout=args.timeout), args, payloads)
+
+    # Import di sini supaya env (model path, cache) dari main() sudah berlaku
+    from app.main import app
+
+    # ASGITransport tidak menjalankan lifespan, jadi load model dipicu manual
+    async with app.router.lifespan_context(app):
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=args.timeout
+        )
+        return await run_against(client, args, payloads)
+
+async def run_against(client, args, payloads: List[dict]) -> dict:
+    async with client:
+        load_start = time.perf_counter()
+        while True:
+            r = await client.get("/ready")
+            if r.status_code == 200:
+                break
+            if r.json().get("status") == "error":
+                raise RuntimeError(f"Model gagal dimuat: {r.json().get('message')}")
+            if time.perf_counter() - load_start > args.timeout:
+                raise RuntimeError("Model tidak siap dalam batas --timeout")
+            await asyncio.sleep(0.2)
+        ready_seconds = time.perf_counter() - load_start
+
+        if args.warmup:
+            await run_level(client, payloads, min(args.warmup, max(args.concurrency)), args.warmup)
+
+        levels = []
+        for concurrency in args.concurrency:
+            levels.append(await run_level(client, payloads, concurrency, args.requests))
+
+    return {"ready_seconds": ready_seconds, "levels": levels}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark throughput & latensi endpoint /highlight.")
+    parser.add_argument("--input", required=True, help="CSV/JSONL korpus artikel (kolom content)")
+    parser.add_argument("--limit", type=int, default=200, help="Jumlah artikel yang dipakai dari korpus")
+    parser.add_argument("--url", help="URL server yang sedang berjalan (default: in-process lewat ASGI)")
+    parser.add_argument("--server-pid", type=int, help="PID server untuk membaca RSS puncak (mode --url)")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        type=lambda s: [int(c) for c in s.split(",") if c.strip()],
+                        help="Daftar level konkurensi, dipisah koma")
+    parser.add_argument("--requests", type=int, default=100, help="Jumlah request per level konkurensi")
+    parser.add_argument("--warmup", type=int, default=4, help="Request pemanasan sebelum pengukuran")
+    parser.add_argument("--max-length", type=int, default=75)
+    parser.add_argument("--min-length", type=int, default=30)
+    parser.add_argument("--no-repeat-ngram-size", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Batas waktu per request & load model (detik)")
+    parser.add_argument("--tiny-model", metavar="DIR",
+                        help="Bangun (sekali) dan pakai T5 acak kecil di DIR, tanpa checkpoint asli")
+    parser.add_argument("--keep-cache", action="store_true",
+                        help="Jangan matikan cache highlight & encoder pada mode in-process")
+    parser.add_argument("--output", help="Tulis laporan JSON ke file ini (selain ke stdout)")
+    args = parser.parse_args(argv)
+
+    _require_httpx()
+    texts = [r.get("content", "") for r in itertools.islice(iter_records(args.input), args.limit)]
+    texts = [t for t in texts if t.strip()]
+    if not texts:
+        parser.error("Tidak ada artikel dengan content di input")
+    if not args.concurrency or min(args.concurrency) < 1:
+        parser.error("--concurrency harus berisi bilangan >= 1")
+
+    if not args.url:
+        if args.tiny_model:
+            os.environ["HIGHLIGHT_MODEL_PATH"] = build_tiny_model(args.tiny_model, texts)
+        if not args.keep_cache:
+            os.environ["HIGHLIGHT_CACHE_MAX_ENTRIES"] = "0"
+            # Payload diulang di setiap level concurrency; encoder jangan dilewati
+            os.environ["HIGHLIGHT_ENCODER_CACHE_MB"] = "0"
+    elif args.tiny_model:
+        parser.error("--tiny-model hanya untuk mode in-process (tanpa --url)")
+
+    payloads = [
+        {
+            "content": t,
+            "max_length": args.max_length,
+            "min_length": args.min_length,
+            "no_repeat_ngram_size": args.no_repeat_ngram_size,
+        }
+        for t in texts
+    ]
+    result = asyncio.run(run_benchmark(args, payloads))
+
+    report = {
+        "mode": "url" if args.url else "in-process",
+        "url": args.url,
+        "model_path": None if args.url else os.getenv("HIGHLIGHT_MODEL_PATH"),
+        "tiny_model": bool(args.tiny_model),
+        "articles": len(texts),
+        "params": {
+            "max_length": args.max_length,
+            "min_length": args.min_length,
+            "no_repeat_ngram_size": args.no_repeat_ngram_size,
+        },
+        "environment": environment_info(),
+        **result,
+        "peak_rss_mb": peak_rss_mb(args.server_pid if args.url else None),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Meringkas korpus JSONL/CSV secara offline tanpa lewat HTTP.
+
+    python -m app.tools.bulk --input news_tempo_hukum_last3y.csv --output highlights.jsonl
+    python -m app.tools.bulk --input news.csv --output out.jsonl --workers 4
+    python -m app.tools.bulk --input news.csv --output out.jsonl --resume
+    python -m app.tools.bulk --input news.csv --output part0.jsonl --shard 0/2   # mesin 1 dari 2
+
+Record dibaca streaming, diringkas per --chunk-size artikel lewat
+generate_highlights_batch (urut panjang token, --batch-size per
+generate) dan hasilnya langsung ditulis & di-flush, jadi memori tetap
+kecil berapa pun ukuran korpus. Setiap baris output:
+
+    {"offset": 12, "id": "...", "highlight": "...", "error": null}
+
+offset = nomor record di input (mulai 0). --resume melanjutkan dari
+offset setelah baris terakhir yang lengkap di output; --start memulai
+dari offset tertentu. --shard I/N hanya memproses record dengan
+offset % N == I. --workers N menjalankan N proses (masing-masing satu
+shard, thread torch dibagi rata) lalu menggabungkan output per shard
+urut offset ke --output.
+"""
+import argparse
+import heapq
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from app.tools.corpus import iter_records
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    try:
+        index, count = (int(v) for v in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("format --shard: I/N, mis. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("--shard I/N butuh 0 <= I < N")
+    return index, count
+
+def resume_offset(path: str) -> int:
+    """
+    Offset berikutnya setelah baris lengkap terakhir di output. Baris
+    terakhir yang terpotong (proses mati saat menulis) dibuang.
+    """
+    if not os.path.exists(path):
+        return 0
+    last_offset, good_end = -1, 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                last_offset = json.loads(line)["offset"]
+            except (ValueError, KeyError):
+                break
+            good_end = f.tell()
+    if good_end < os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_end)
+    return last_offset + 1
+
+def iter_shard(path: str, start: int, shard: Tuple[int, int]) -> Iterator[Tuple[int, dict]]:
+    index, count = shard
+    for offset, record in enumerate(iter_records(path)):
+        if offset >= start and offset % count == index:
+            yield offset, record
+
+def run_shard(args, shard: Tuple[int, int], output: str):
+    # Import di sini supaya env dari proses induk (thread torch, model) sudah berlaku
+    from app.services.summarizer_service import generate_highlights_batch
+
+    start = args.start
+    if args.resume:
+        start = max(start, resume_offset(output))
+    elif os.path.exists(output) and os.path.getsize(output) > 0:
+        sys.exit(f"{output} sudah ada; pakai --resume untuk melanjutkan atau hapus dulu")
+
+    fields = [f for f in (args.fields or "").split(",") if f]
+    done = failed = 0
+    started = time.perf_counter()
+
+    def flush(chunk: List[Tuple[int, dict]], out):
+        nonlocal done, failed
+        items = [
+            (record.get(args.content_field) or "", args.max_length, args.min_length,
+             args.no_repeat_ngram_size, args.model)
+            for _, record in chunk
+        ]
+        results = generate_highlights_batch(items, batch_size=args.batch_size, decoding=args.decoding)
+        for (offset, record), (highlight, error) in zip(chunk, results):
+            row = {"offset": offset, "id": record.get(args.id_field), "highlight": highlight, "error": error}
+            for field in fields:
+                row[field] = record.get(field)
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            done += error is None
+            failed += error is not None
+        out.flush()
+        elapsed = time.perf_counter() - started
+        print(
+            f"[shard {shard[0]}/{shard[1]}] offset {chunk[-1][0]}: {done} ok, {failed} gagal, "
+            f"{(done + failed) / elapsed:.1f} artikel/detik",
+            file=sys.stderr, flush=True
+        )
+
+    with open(output, "a", encoding="utf-8") as out:
+        chunk: List[Tuple[int, dict]] = []
+        for item in iter_shard(args.input, start, shard):
+            chunk.append(item)
+            if len(chunk) >= args.chunk_size:
+                flush(chunk, out)
+                chunk = []
+        if chunk:
+            flush(chunk, out)
+    return done, failed
+
+def shard_output(output: str, index: int, count: int) -> str:
+    return f"{output}.shard{index}-of-{count}"
+
+def merge_outputs(paths: List[str], output: str, append: bool):
+    """
+    Setiap shard sudah urut offset, jadi merge streaming cukup
+    """
+    def rows(path: str):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)["offset"], line
+
+    with open(output, "a" if append else "w", encoding="utf-8") as out:
+        for _, line in heapq.merge(*(rows(p) for p in paths), key=lambda r: r[0]):
+            out.write(line)
+
+def run_workers(args, argv: List[str]):
+    """
+    Menjalankan --workers proses anak (satu shard per proses) dengan
+    thread torch dibagi rata, lalu menggabungkan hasilnya ke --output
+    """
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    env = dict(os.environ, HIGHLIGHT_TORCH_THREADS=str(threads), TOKENIZERS_PARALLELISM="false")
+    # Argumen yang sama diteruskan ke anak; --output/--start ditimpa per shard
+    base, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == "--workers":
+            skip = True
+        elif not arg.startswith("--workers="):
+            base.append(arg)
+
+    # Saat resume, output gabungan yang sudah ada dipertahankan; shard mulai setelahnya
+    start = resume_offset(args.output) if args.resume else args.start
+    if not args.resume and os.path.exists(args.output) and os.path.getsize(args.output) > 0:
+        sys.exit(f"{args.output} sudah ada; pakai --resume untuk melanjutkan atau hapus dulu")
+
+    paths = [shard_output(args.output, i, args.workers) for i in range(args.workers)]
+    procs = []
+    for i, path in enumerate(paths):
+        cmd = [sys.executable, "-m", "app.tools.bulk", *base, "--shard", f"{i}/{args.workers}",
+               "--output", path, "--start", str(start)]
+        procs.append(subprocess.Popen(cmd, env=env))
+    codes = [p.wait() for p in procs]
+    if any(codes):
+        # File shard dibiarkan; --resume dengan --workers yang sama melanjutkannya
+        sys.exit(f"Worker gagal (exit code {codes}); jalankan ulang dengan --resume")
+
+    merge_outputs(paths, args.output, append=args.resume)
+    for path in paths:
+        os.remove(path)
+
+def main(argv: Optional[List[str]] = None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    parser = argparse.ArgumentParser(description="Ringkas korpus JSONL/CSV secara offline (tanpa HTTP).")
+    parser.add_argument("--input", required=True, help="CSV hasil scraptempo.py atau JSONL")
+    parser.add_argument("--output", required=True, help="File JSONL hasil (ditulis bertahap)")
+    parser.add_argument("--content-field", default="content")
+    parser.add_argument("--id-field", default="url", help="Field record yang disalin sebagai id")
+    parser.add_argument("--fields", help="Field lain yang ikut disalin ke output, dipisah koma (mis. title,date)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Artikel per putaran baca-ringkas-tulis")
+    parser.add_argument("--batch-size", type=int, default=8, help="Artikel per generate()")
+    parser.add_argument("--max-length", type=int, default=75)
+    parser.add_argument("--min-length", type=int, default=30)
+    parser.add_argument("--no-repeat-ngram-size", type=int, default=2)
+    parser.add_argument("--model", help="Nama model dari HIGHLIGHT_MODELS (default: model default)")
+    parser.add_argument("--decoding", help="beam | greedy | prompt_lookup | assisted")
+    parser.add_argument("--start", type=int, default=0, help="Mulai dari offset record ini")
+    parser.add_argument("--resume", action="store_true", help="Lanjutkan setelah baris terakhir di --output")
+    parser.add_argument("--shard", type=parse_shard, default=(0, 1), metavar="I/N")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses lokal (masing-masing satu shard)")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1 or args.batch_size < 1:
+        parser.error("--chunk-size dan --batch-size minimal 1")
+    if args.workers > 1:
+        if args.shard != (0, 1):
+            parser.error("--workers tidak bisa digabung dengan --shard")
+        run_workers(args, argv)
+        return
+
+    run_shard(args, args.shard, args.output)
+
+if __name__ == "__main__":
+    main()
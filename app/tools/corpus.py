@@ -0,0 +1,22 @@
+import csv
+import json
+import sys
+from typing import Dict, Iterator
+
+def iter_records(path: str) -> Iterator[Dict[str, str]]:
+    """
+    Membaca artikel dari JSONL (satu objek per baris) atau CSV hasil
+    scraptempo.py secara streaming. Setiap record minimal punya "content".
+    """
+    if path.endswith(".csv"):
+        # Konten artikel Tempo bisa melebihi batas field default modul csv
+        csv.field_size_limit(sys.maxsize)
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield row
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
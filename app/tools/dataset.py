@@ -0,0 +1,368 @@
+"""
+Dataset ter-tokenisasi dalam file memory-mapped untuk fine-tuning & evaluasi.
+
+    python -m app.tools.dataset build --input news_tempo_hukum_last3y.csv --output data/tempo_hukum
+    python -m app.tools.dataset build --input news_baru.csv --output data/tempo_hukum --append
+    python -m app.tools.dataset info data/tempo_hukum
+
+Setiap artikel dinormalisasi sekali dengan preprocess_input_text (sama
+dengan API), ditokenisasi bersama prefix tugas model lewat encode_texts
+(dipotong ke 512 token & <unk> dibuang, sama dengan encode_input),
+highlight ditokenisasi sebagai label.
+Isi direktori:
+
+    content.bin     token id content, disambung tanpa padding
+    highlight.bin   token id highlight, disambung tanpa padding
+    index.bin       int64 [n, 4]: offset & panjang content, offset & panjang highlight
+    records.jsonl   id (mis. url) per record, urut sama dengan index
+    meta.json       dtype, jumlah record/token, tokenizer, prefix
+
+meta.json ditulis terakhir (atomic) dan menjadi titik commit: --append
+membuang byte setelah jumlah yang tercatat di meta (sisa proses yang
+mati di tengah jalan) lalu hanya menambah record dengan id baru.
+
+    from app.tools.dataset import TokenizedDataset
+    ds = TokenizedDataset("data/tempo_hukum")
+    for batch in ds.length_batches(8, shuffle=True):
+        arrays = ds.collate(batch)   # input_ids, attention_mask, labels (numpy)
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from app.tools.corpus import iter_records
+
+FORMAT_VERSION = 1
+CONTENT_FILE = "content.bin"
+HIGHLIGHT_FILE = "highlight.bin"
+INDEX_FILE = "index.bin"
+RECORDS_FILE = "records.jsonl"
+META_FILE = "meta.json"
+
+def task_prefix(model_path: str) -> str:
+    """Prefix tugas dari config model, sama dengan LoadedModel.prefix."""
+    from transformers import AutoConfig
+
+    config = AutoConfig.from_pretrained(model_path)
+    prefix = getattr(config, "prefix", None) or ""
+    task_params = (getattr(config, "task_specific_params", None) or {}).get("summarization") or {}
+    return task_params.get("prefix", prefix) or ""
+
+def read_meta(path: str) -> Optional[dict]:
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+def write_meta(path: str, meta: dict):
+    tmp = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, META_FILE))
+
+def _truncate(path: str, size: int):
+    with open(path, "ab") as f:
+        f.truncate(size)
+
+class TokenizedDataset:
+    """
+    Akses acak zero-copy ke dataset hasil `build`: setiap item adalah
+    view numpy ke file memory-mapped, bukan salinan.
+    """
+
+    def __init__(self, path: str):
+        meta = read_meta(path)
+        if meta is None:
+            raise FileNotFoundError(f"Bukan direktori dataset: {path} ({META_FILE} tidak ada)")
+        if meta["format"] != FORMAT_VERSION:
+            raise ValueError(f"Format dataset {meta['format']} tidak didukung (butuh {FORMAT_VERSION})")
+        self.path = path
+        self.meta = meta
+        dtype = np.dtype(meta["dtype"])
+        self.content = self._map(CONTENT_FILE, dtype, (meta["content_tokens"],))
+        self.highlight = self._map(HIGHLIGHT_FILE, dtype, (meta["highlight_tokens"],))
+        self.index = self._map(INDEX_FILE, np.int64, (meta["count"], 4))
+        self._ids: Optional[List[str]] = None
+
+    def _map(self, name: str, dtype, shape) -> np.ndarray:
+        # File boleh lebih panjang dari meta (append yang belum commit)
+        if not shape[0]:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r", shape=shape)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, i: int) -> Dict[str, np.ndarray]:
+        c_off, c_len, h_off, h_len = self.index[i]
+        return {
+            "input_ids": self.content[c_off:c_off + c_len],
+            "labels": self.highlight[h_off:h_off + h_len],
+        }
+
+    @property
+    def input_lengths(self) -> np.ndarray:
+        return self.index[:, 1]
+
+    @property
+    def label_lengths(self) -> np.ndarray:
+        return self.index[:, 3]
+
+    @property
+    def ids(self) -> List[str]:
+        if self._ids is None:
+            with open(os.path.join(self.path, RECORDS_FILE), encoding="utf-8") as f:
+                self._ids = [json.loads(line)["id"] for _, line in zip(range(len(self)), f)]
+        return self._ids
+
+    def length_batches(
+        self,
+        batch_size: int,
+        shuffle: bool = True,
+        seed: int = 0,
+        pool_batches: int = 50,
+        indices: Optional[Iterable[int]] = None
+    ) -> Iterator[List[int]]:
+        """
+        Batch index dengan panjang input berdekatan (padding minim).
+        shuffle: index diacak, diurutkan per kelompok pool_batches batch,
+        lalu urutan batch diacak; tanpa shuffle seluruh data diurutkan
+        panjang (cocok untuk evaluasi).
+        """
+        order = np.arange(len(self)) if indices is None else np.fromiter(indices, dtype=np.int64)
+        lengths = self.input_lengths
+        if not shuffle:
+            order = order[np.argsort(lengths[order], kind="stable")]
+            for start in range(0, len(order), batch_size):
+                yield order[start:start + batch_size].tolist()
+            return
+
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(order)
+        pool = batch_size * pool_batches
+        batches = []
+        for start in range(0, len(order), pool):
+            chunk = order[start:start + pool]
+            chunk = chunk[np.argsort(lengths[chunk], kind="stable")]
+            batches.extend(chunk[i:i + batch_size].tolist() for i in range(0, len(chunk), batch_size))
+        random.Random(seed).shuffle(batches)
+        yield from batches
+
+    def collate(
+        self,
+        indices: List[int],
+        pad_token_id: Optional[int] = None,
+        label_pad_id: int = -100
+    ) -> Dict[str, np.ndarray]:
+        """
+        Padding ke panjang terpanjang di batch. Label di-pad -100 supaya
+        diabaikan loss; pakai torch.from_numpy untuk tensor.
+        """
+        pad = self.meta["pad_token_id"] if pad_token_id is None else pad_token_id
+        items = [self[i] for i in indices]
+        width = max((len(it["input_ids"]) for it in items), default=0)
+        label_width = max((len(it["labels"]) for it in items), default=0)
+        input_ids = np.full((len(items), width), pad, dtype=np.int64)
+        attention_mask = np.zeros((len(items), width), dtype=np.int64)
+        labels = np.full((len(items), label_width), label_pad_id, dtype=np.int64)
+        for row, it in enumerate(items):
+            n, k = len(it["input_ids"]), len(it["labels"])
+            input_ids[row, :n] = it["input_ids"]
+            attention_mask[row, :n] = 1
+            labels[row, :k] = it["labels"]
+        return {"input_ids": input_ids, "attention_mask": attention_mask, "labels": labels}
+
+def build(
+    records: Iterable[dict],
+    out_dir: str,
+    model_path: str,
+    append: bool = False,
+    content_field: str = "content",
+    highlight_field: str = "highlight",
+    id_field: str = "url",
+    max_input_tokens: int = 512,
+    max_target_tokens: Optional[int] = None,
+    prefix: Optional[str] = None,
+    chunk_size: int = 1000,
+    log=None
+) -> dict:
+    """
+    Menulis (atau menambah) dataset di out_dir. Mengembalikan ringkasan
+    jumlah record yang ditambah / dilewati.
+    """
+    from transformers import AutoTokenizer
+
+    from app.services.model_registry import tokenizer_fingerprint
+    from app.services.summarizer_service import encode_texts, preprocess_input_text
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    fingerprint = tokenizer_fingerprint(model_path)
+    meta = read_meta(out_dir)
+
+    if meta is not None:
+        if not append:
+            raise FileExistsError(f"{out_dir} sudah berisi dataset; pakai --append untuk menambah")
+        if meta["tokenizer_fingerprint"] != fingerprint:
+            raise ValueError("Tokenizer berbeda dengan dataset yang ada; build ulang ke direktori baru")
+        if not meta.get("unk_round_trip"):
+            # Dataset lama: input dengan <unk> ditokenisasi berbeda dari API
+            raise ValueError("Dataset dibuat sebelum encode_texts; build ulang ke direktori baru")
+        prefix = meta["prefix"]
+        max_input_tokens, max_target_tokens = meta["max_input_tokens"], meta["max_target_tokens"]
+    else:
+        prefix = task_prefix(model_path) if prefix is None else prefix
+        meta = {
+            "format": FORMAT_VERSION,
+            "dtype": "uint16" if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else "uint32",
+            "count": 0, "content_tokens": 0, "highlight_tokens": 0, "records_bytes": 0,
+            "model_path": model_path, "tokenizer_fingerprint": fingerprint,
+            "pad_token_id": tokenizer.pad_token_id or 0, "prefix": prefix,
+            "max_input_tokens": max_input_tokens, "max_target_tokens": max_target_tokens,
+            "unk_round_trip": True,
+        }
+
+    paths = {name: os.path.join(out_dir, name) for name in (CONTENT_FILE, HIGHLIGHT_FILE, INDEX_FILE, RECORDS_FILE)}
+    dtype = np.dtype(meta["dtype"])
+    # Buang sisa tulisan yang belum tercatat di meta
+    _truncate(paths[CONTENT_FILE], meta["content_tokens"] * dtype.itemsize)
+    _truncate(paths[HIGHLIGHT_FILE], meta["highlight_tokens"] * dtype.itemsize)
+    _truncate(paths[INDEX_FILE], meta["count"] * 4 * 8)
+    _truncate(paths[RECORDS_FILE], meta["records_bytes"])
+
+    seen = set()
+    if meta["count"]:
+        with open(paths[RECORDS_FILE], encoding="utf-8") as f:
+            seen = {json.loads(line)["id"] for line in f}
+
+    stats = {"added": 0, "duplicate": 0, "empty": 0}
+    files = {name: open(p, "ab") for name, p in paths.items()}
+
+    def flush(chunk: List[dict]):
+        highlights = [r["highlight"] for r in chunk]
+        inputs = encode_texts(tokenizer, [r["text"] for r in chunk], prefix, max_input_tokens)
+        if max_target_tokens:
+            labels = tokenizer(highlights, truncation=True, max_length=max_target_tokens)["input_ids"]
+        else:
+            labels = tokenizer(highlights)["input_ids"]
+
+        index = np.empty((len(chunk), 4), dtype=np.int64)
+        c_off, h_off = meta["content_tokens"], meta["highlight_tokens"]
+        for row, (ids, label_ids) in enumerate(zip(inputs, labels)):
+            index[row] = (c_off, len(ids), h_off, len(label_ids))
+            c_off += len(ids)
+            h_off += len(label_ids)
+        np.fromiter((t for ids in inputs for t in ids), dtype=dtype).tofile(files[CONTENT_FILE])
+        np.fromiter((t for ids in labels for t in ids), dtype=dtype).tofile(files[HIGHLIGHT_FILE])
+        index.tofile(files[INDEX_FILE])
+        records = "".join(json.dumps({"id": r["id"]}, ensure_ascii=False) + "\n" for r in chunk).encode("utf-8")
+        files[RECORDS_FILE].write(records)
+
+        for f in files.values():
+            f.flush()
+            os.fsync(f.fileno())
+        meta.update(
+            count=meta["count"] + len(chunk), content_tokens=c_off, highlight_tokens=h_off,
+            records_bytes=meta["records_bytes"] + len(records)
+        )
+        write_meta(out_dir, meta)
+        stats["added"] += len(chunk)
+        if log:
+            log(f"{meta['count']} record, {meta['content_tokens']} token content")
+
+    try:
+        chunk: List[dict] = []
+        for record in records:
+            text = preprocess_input_text(record.get(content_field) or "")
+            if not text:
+                stats["empty"] += 1
+                continue
+            # Tanpa id, hash teks jadi id supaya --append tetap bisa melewati record lama
+            record_id = str(record.get(id_field) or hashlib.sha1(text.encode("utf-8")).hexdigest())
+            if record_id in seen:
+                stats["duplicate"] += 1
+                continue
+            seen.add(record_id)
+            chunk.append({"id": record_id, "text": text, "highlight": (record.get(highlight_field) or "").strip()})
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+        if not os.path.exists(os.path.join(out_dir, META_FILE)):
+            write_meta(out_dir, meta)
+    finally:
+        for f in files.values():
+            f.close()
+    return {**stats, "count": meta["count"]}
+
+def info(path: str) -> dict:
+    ds = TokenizedDataset(path)
+    lengths = ds.input_lengths
+    sizes = {
+        name: os.path.getsize(os.path.join(path, name))
+        for name in (CONTENT_FILE, HIGHLIGHT_FILE, INDEX_FILE, RECORDS_FILE)
+    }
+    report = {key: ds.meta[key] for key in ("count", "content_tokens", "highlight_tokens", "dtype", "prefix",
+                                            "model_path", "max_input_tokens", "max_target_tokens")}
+    if len(ds):
+        report["input_length"] = {
+            "mean": round(float(lengths.mean()), 1),
+            "p50": int(np.percentile(lengths, 50)),
+            "p95": int(np.percentile(lengths, 95)),
+            "max": int(lengths.max()),
+            "truncated": int((lengths >= ds.meta["max_input_tokens"]).sum()),
+        }
+        report["label_length"] = {"mean": round(float(ds.label_lengths.mean()), 1), "max": int(ds.label_lengths.max())}
+    report["bytes"] = sizes
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dataset ter-tokenisasi memory-mapped untuk training & evaluasi.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Preprocess + tokenisasi korpus CSV/JSONL ke direktori dataset")
+    b.add_argument("--input", required=True, help="CSV hasil scraptempo.py atau JSONL")
+    b.add_argument("--output", required=True, help="Direktori dataset")
+    b.add_argument("--append", action="store_true", help="Tambah record dengan id baru ke dataset yang ada")
+    b.add_argument("--model-path", default=os.getenv("HIGHLIGHT_MODEL_PATH", "models/finetuned_wikidepia"),
+                   help="Checkpoint yang tokenizer & prefix-nya dipakai")
+    b.add_argument("--prefix", default=None, help="Prefix tugas (default: dari config model, mis. 'ringkasan: ')")
+    b.add_argument("--content-field", default="content")
+    b.add_argument("--highlight-field", default="highlight", help="Field target (mis. summary di notebook)")
+    b.add_argument("--id-field", default="url", help="Field id unik; dipakai --append untuk melewati record lama")
+    b.add_argument("--max-input-tokens", type=int, default=512)
+    b.add_argument("--max-target-tokens", type=int, default=None, help="Potong label (default: tidak dipotong)")
+    b.add_argument("--chunk-size", type=int, default=1000, help="Record per tokenisasi & commit")
+
+    i = sub.add_parser("info", help="Ringkasan isi dataset")
+    i.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        print(json.dumps(info(args.path), ensure_ascii=False, indent=2))
+        return
+
+    try:
+        result = build(
+            iter_records(args.input), args.output, args.model_path,
+            append=args.append, content_field=args.content_field, highlight_field=args.highlight_field,
+            id_field=args.id_field, max_input_tokens=args.max_input_tokens,
+            max_target_tokens=args.max_target_tokens, prefix=args.prefix, chunk_size=args.chunk_size,
+            log=lambda msg: print(msg, file=sys.stderr, flush=True)
+        )
+    except (FileExistsError, ValueError) as e:
+        sys.exit(str(e))
+    print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
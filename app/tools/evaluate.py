@@ -0,0 +1,256 @@
+"""
+Evaluasi kualitas + kecepatan checkpoint di models/ pada data held-out.
+
+    python -m app.tools.evaluate --input news_tempo_hukum_last3y.csv --holdout 0.1
+    python -m app.tools.evaluate --input uji.csv --models wikidepia=models/finetuned_wikidepia,cahya=models/finetuned_cahya
+    python -m app.tools.evaluate --input uji.csv --backends torch,onnx-int8 --decoding greedy --output eval.json
+
+Setiap checkpoint x backend menjalankan artikel held-out lewat jalur yang
+sama dengan API (preprocess_input_text, encode_input, summarize_ids +
+postprocess_summary) tanpa cache highlight. Artikel diurutkan per
+panjang token lalu di-generate per --batch-size supaya padding minim.
+ROUGE-1/2/L F1 terhadap highlight referensi dihitung di process pool
+selagi batch berikutnya di-generate. Laporan JSON per run: ROUGE rata-
+rata, durasi, artikel/detik, token output/detik dan latensi batch
+p50/p95.
+
+--holdout F memilih subset stabil berdasarkan hash id (--id-field):
+artikel yang sama selalu masuk split yang sama walau korpus bertambah.
+Tanpa --models, semua checkpoint di models/ (folder berisi config.json,
+bobot torch dan vocab tokenizer) dievaluasi.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from app.tools.benchmark import environment_info, percentile
+from app.tools.corpus import iter_records
+from app.tools.rouge import rouge_scores
+
+ROUGE_KEYS = ("rouge1", "rouge2", "rougeL")
+# Checkpoint = bobot torch + file vocab tokenizer (bukan export ONNX / folder lain)
+WEIGHT_FILES = ("model.safetensors", "model.safetensors.index.json", "pytorch_model.bin", "pytorch_model.bin.index.json")
+VOCAB_FILES = ("spiece.model", "tokenizer.json", "vocab.json")
+
+def is_checkpoint(path: str) -> bool:
+    def has(names):
+        return any(os.path.isfile(os.path.join(path, n)) for n in names)
+    return has(("config.json",)) and has(WEIGHT_FILES) and has(VOCAB_FILES)
+
+def discover_models(root: str = "models") -> Dict[str, str]:
+    """Folder checkpoint di root -> {nama: path}, nama tanpa awalan finetuned_."""
+    from app.services.model_registry import parse_models
+
+    if not os.path.isdir(root):
+        return {}
+    paths = sorted(
+        os.path.join(root, name) for name in os.listdir(root)
+        if is_checkpoint(os.path.join(root, name))
+    )
+    models: Dict[str, str] = {}
+    for path in paths:
+        models.update(parse_models("", path))
+    return models
+
+def in_holdout(record_id: str, fraction: float) -> bool:
+    digest = hashlib.sha1(record_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2 ** 32 < fraction
+
+def load_split(args) -> List[dict]:
+    records = []
+    for offset, record in enumerate(iter_records(args.input)):
+        content = record.get(args.content_field) or ""
+        reference = (record.get(args.reference_field) or "").strip()
+        if not content.strip() or not reference:
+            continue
+        record_id = str(record.get(args.id_field) or offset)
+        if args.holdout < 1 and not in_holdout(record_id, args.holdout):
+            continue
+        records.append({"id": record_id, "content": content, "reference": reference})
+        if args.limit and len(records) >= args.limit:
+            break
+    return records
+
+def score_pairs(pairs: List[Tuple[str, str]]) -> List[Dict[str, float]]:
+    # Dijalankan di proses pool; harus fungsi level modul supaya bisa di-pickle
+    return [rouge_scores(reference, hypothesis) for reference, hypothesis in pairs]
+
+def evaluate_run(
+    name: str,
+    path: str,
+    backend: str,
+    records: List[dict],
+    pool: ProcessPoolExecutor,
+    args
+) -> Tuple[dict, List[str], List[Dict[str, float]]]:
+    from app.services import metrics
+    from app.services.cache_service import encoder_cache
+    from app.services.decoding import resolve_decoding
+    from app.services.model_registry import ModelRegistry
+    from app.services.summarizer_service import (
+        MAX_INPUT_TOKENS,
+        encode_input,
+        preprocess_input_text,
+        summarize_ids,
+    )
+
+    registry = ModelRegistry(path, backend=backend)
+    load_start = time.perf_counter()
+    m = registry.load()
+    load_seconds = time.perf_counter() - load_start
+
+    gen_kwargs = {
+        "max_length": args.max_length,
+        "min_length": args.min_length,
+        "no_repeat_ngram_size": args.no_repeat_ngram_size,
+        "decoding": resolve_decoding(args.decoding),
+    }
+    batch_ids = [encode_input(preprocess_input_text(r["content"]), MAX_INPUT_TOKENS, model=m) for r in records]
+    order = sorted(range(len(records)), key=lambda i: len(batch_ids[i]))
+
+    # Pemanasan di luar pengukuran
+    summarize_ids([batch_ids[order[0]]], model=m, **gen_kwargs)
+    # Model/backend sebelumnya bisa punya input yang sama; ukur encoder dari awal
+    encoder_cache.clear()
+
+    highlights: List[str] = [""] * len(records)
+    latencies: List[float] = []
+    scoring: List[Tuple[List[int], Future]] = []
+    tokens_before, _ = metrics.OUTPUT_TOKENS.total()
+    start = time.perf_counter()
+    for i in range(0, len(order), args.batch_size):
+        chunk = order[i:i + args.batch_size]
+        t0 = time.perf_counter()
+        outputs = summarize_ids([batch_ids[j] for j in chunk], model=m, **gen_kwargs)
+        latencies.append(time.perf_counter() - t0)
+        for j, highlight in zip(chunk, outputs):
+            highlights[j] = highlight
+        # ROUGE batch ini dihitung paralel selagi batch berikutnya di-generate
+        scoring.append((chunk, pool.submit(score_pairs, [(records[j]["reference"], highlights[j]) for j in chunk])))
+    elapsed = time.perf_counter() - start
+    tokens = metrics.OUTPUT_TOKENS.total()[0] - tokens_before
+
+    scores: List[Dict[str, float]] = [{}] * len(records)
+    for chunk, future in scoring:
+        for j, s in zip(chunk, future.result()):
+            scores[j] = s
+    registry.unload()
+
+    n = len(records)
+    report = {
+        "model": name,
+        "path": path,
+        "backend": backend,
+        "decoding": gen_kwargs["decoding"],
+        "articles": n,
+        **{key: round(sum(s[key] for s in scores) / n, 4) for key in ROUGE_KEYS},
+        "empty_highlights": sum(not h for h in highlights),
+        "load_seconds": round(load_seconds, 2),
+        "seconds": round(elapsed, 3),
+        "articles_per_second": round(n / elapsed, 2) if elapsed else None,
+        "output_tokens": int(tokens),
+        "tokens_per_second": round(tokens / elapsed, 1) if elapsed else None,
+        "batch_size": args.batch_size,
+        "batch_latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "batch_latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "input_tokens_mean": round(sum(len(ids) for ids in batch_ids) / n, 1),
+    }
+    return report, highlights, scores
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluasi ROUGE + latensi checkpoint dan backend.")
+    parser.add_argument("--input", required=True, help="CSV/JSONL berisi content & highlight referensi")
+    parser.add_argument("--models", default=None,
+                        help="nama=path dipisah koma (default: semua checkpoint di --models-dir)")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--backends", default="torch", help="Backend dipisah koma: torch, onnx, onnx-int8")
+    parser.add_argument("--decoding", default=None, help="beam | greedy | prompt_lookup | assisted (default: HIGHLIGHT_DECODING)")
+    parser.add_argument("--content-field", default="content")
+    parser.add_argument("--reference-field", default="highlight", help="Field highlight referensi (mis. summary)")
+    parser.add_argument("--id-field", default="url")
+    parser.add_argument("--holdout", type=float, default=1.0,
+                        help="Fraksi artikel (dipilih stabil via hash id) yang dievaluasi; 1 = semua input")
+    parser.add_argument("--limit", type=int, default=None, help="Maksimal artikel setelah filter holdout")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-length", type=int, default=75)
+    parser.add_argument("--min-length", type=int, default=30)
+    parser.add_argument("--no-repeat-ngram-size", type=int, default=2)
+    parser.add_argument("--rouge-workers", type=int, default=os.cpu_count() or 1, help="Proses untuk menghitung ROUGE")
+    parser.add_argument("--predictions", help="Tulis highlight & ROUGE per artikel per run ke JSONL ini")
+    parser.add_argument("--output", help="Tulis laporan JSON ke file ini (selain ke stdout)")
+    args = parser.parse_args(argv)
+
+    from app.services.backends import BACKENDS
+    from app.services.decoding import DECODING_MODES
+    from app.services.model_registry import parse_models
+
+    if not 0 < args.holdout <= 1:
+        parser.error("--holdout harus di antara 0 (eksklusif) dan 1")
+    if args.batch_size < 1:
+        parser.error("--batch-size minimal 1")
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        parser.error(f"Backend tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(BACKENDS)})")
+    if args.decoding is not None and args.decoding not in DECODING_MODES:
+        parser.error(f"Decoding tidak dikenal: {args.decoding} (pilihan: {', '.join(DECODING_MODES)})")
+    try:
+        models = parse_models(args.models, "") if args.models else discover_models(args.models_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    if not models:
+        parser.error(f"Tidak ada checkpoint di {args.models_dir}; pakai --models nama=path")
+
+    records = load_split(args)
+    if not records:
+        parser.error("Tidak ada artikel dengan content & highlight referensi di split ini")
+
+    runs = []
+    predictions = open(args.predictions, "w", encoding="utf-8") if args.predictions else None
+    # spawn: proses ROUGE tidak mewarisi thread torch/tokenizer dari proses induk
+    with ProcessPoolExecutor(max(1, args.rouge_workers), mp_context=multiprocessing.get_context("spawn")) as pool:
+        try:
+            for name, path in models.items():
+                for backend in backends:
+                    print(f"[{name}/{backend}] {len(records)} artikel…", file=sys.stderr, flush=True)
+                    report, highlights, scores = evaluate_run(name, path, backend, records, pool, args)
+                    runs.append(report)
+                    print(
+                        f"[{name}/{backend}] ROUGE-1 {report['rouge1']:.4f}  ROUGE-2 {report['rouge2']:.4f}  "
+                        f"ROUGE-L {report['rougeL']:.4f}  {report['articles_per_second']} artikel/detik",
+                        file=sys.stderr, flush=True
+                    )
+                    if predictions is not None:
+                        for record, highlight, score in zip(records, highlights, scores):
+                            predictions.write(json.dumps({
+                                "model": name, "backend": backend, "id": record["id"],
+                                "highlight": highlight, "reference": record["reference"], **score,
+                            }, ensure_ascii=False) + "\n")
+        finally:
+            if predictions is not None:
+                predictions.close()
+
+    report = {
+        "input": args.input,
+        "holdout": args.holdout,
+        "articles": len(records),
+        "max_length": args.max_length,
+        "min_length": args.min_length,
+        "no_repeat_ngram_size": args.no_repeat_ngram_size,
+        "runs": runs,
+        "environment": environment_info(),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
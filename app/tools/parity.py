@@ -0,0 +1,93 @@
+"""
+Cek paritas backend inference terhadap backend torch.
+
+    python -m app.tools.parity --input news_tempo_hukum_last3y.csv --backend onnx-int8
+
+Highlight dari backend kandidat dibandingkan dengan highlight torch
+(exact match + ROUGE-1/2/L F1) dan latensi keduanya dilaporkan sebagai JSON.
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+from typing import List
+
+from app.services.backends import BACKENDS
+from app.services.cache_service import encoder_cache
+from app.services.model_registry import LoadedModel, ModelRegistry
+from app.services.summarizer_service import (
+    MAX_INPUT_TOKENS,
+    MODEL_PATH,
+    encode_input,
+    preprocess_input_text,
+    summarize_ids,
+)
+from app.tools.corpus import iter_records
+from app.tools.rouge import rouge_scores
+
+def run_backend(model: LoadedModel, texts: List[str], batch_size: int, **gen_kwargs):
+    batch_ids = [encode_input(t, MAX_INPUT_TOKENS, model=model) for t in texts]
+    # Satu generate pemanasan supaya waktu load/kompilasi tidak ikut terukur
+    summarize_ids(batch_ids[:1], model=model, **gen_kwargs)
+    # Waktu setiap backend harus termasuk encoder, bukan hit cache dari pemanasan
+    encoder_cache.clear()
+
+    highlights: List[str] = []
+    start = time.perf_counter()
+    for i in range(0, len(batch_ids), batch_size):
+        highlights.extend(summarize_ids(batch_ids[i:i + batch_size], model=model, **gen_kwargs))
+    return highlights, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan kualitas & latensi backend terhadap torch.")
+    parser.add_argument("--input", required=True, help="CSV/JSONL berisi kolom content")
+    parser.add_argument("--backend", default="onnx-int8", choices=[b for b in BACKENDS if b != "torch"])
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-length", type=int, default=75)
+    parser.add_argument("--min-length", type=int, default=30)
+    parser.add_argument("--no-repeat-ngram-size", type=int, default=2)
+    parser.add_argument("--min-rouge-l", type=float, default=None,
+                        help="Exit code 1 jika rata-rata ROUGE-L di bawah nilai ini")
+    args = parser.parse_args(argv)
+
+    texts = []
+    for record in itertools.islice(iter_records(args.input), args.limit):
+        text = preprocess_input_text(record.get("content", ""))
+        if text:
+            texts.append(text)
+    if not texts:
+        parser.error("Tidak ada artikel dengan content di input")
+
+    gen_kwargs = dict(
+        max_length=args.max_length,
+        min_length=args.min_length,
+        no_repeat_ngram_size=args.no_repeat_ngram_size,
+    )
+    reference = ModelRegistry(args.model_path, backend="torch").load()
+    candidate = ModelRegistry(args.model_path, backend=args.backend).load()
+
+    ref_out, ref_seconds = run_backend(reference, texts, args.batch_size, **gen_kwargs)
+    cand_out, cand_seconds = run_backend(candidate, texts, args.batch_size, **gen_kwargs)
+
+    scores = [rouge_scores(r, c) for r, c in zip(ref_out, cand_out)]
+    report = {
+        "backend": args.backend,
+        "articles": len(texts),
+        "exact_match": sum(r == c for r, c in zip(ref_out, cand_out)) / len(texts),
+        "rouge1": sum(s["rouge1"] for s in scores) / len(scores),
+        "rouge2": sum(s["rouge2"] for s in scores) / len(scores),
+        "rougeL": sum(s["rougeL"] for s in scores) / len(scores),
+        "torch_seconds": ref_seconds,
+        f"{args.backend}_seconds": cand_seconds,
+        "speedup": ref_seconds / cand_seconds if cand_seconds else None,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.min_rouge_l is not None and report["rougeL"] < args.min_rouge_l:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import re
+from collections import Counter
+from typing import Dict, List
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+def _f1(overlap: int, n_ref: int, n_hyp: int) -> float:
+    if overlap == 0 or n_ref == 0 or n_hyp == 0:
+        return 0.0
+    precision = overlap / n_hyp
+    recall = overlap / n_ref
+    return 2 * precision * recall / (precision + recall)
+
+def rouge_n(ref: List[str], hyp: List[str], n: int) -> float:
+    ref_grams = Counter(tuple(ref[i:i + n]) for i in range(len(ref) - n + 1))
+    hyp_grams = Counter(tuple(hyp[i:i + n]) for i in range(len(hyp) - n + 1))
+    overlap = sum((ref_grams & hyp_grams).values())
+    return _f1(overlap, sum(ref_grams.values()), sum(hyp_grams.values()))
+
+def rouge_l(ref: List[str], hyp: List[str]) -> float:
+    # Panjang LCS dengan DP satu baris
+    prev = [0] * (len(hyp) + 1)
+    for r in ref:
+        cur = [0]
+        for j, h in enumerate(hyp):
+            cur.append(prev[j] + 1 if r == h else max(prev[j + 1], cur[j]))
+        prev = cur
+    return _f1(prev[-1], len(ref), len(hyp))
+
+def rouge_scores(reference: str, hypothesis: str) -> Dict[str, float]:
+    """
+    ROUGE-1/2/L F1 berbasis token kata (huruf kecil)
+    """
+    ref, hyp = tokenize(reference), tokenize(hypothesis)
+    return {
+        "rouge1": rouge_n(ref, hyp, 1),
+        "rouge2": rouge_n(ref, hyp, 2),
+        "rougeL": rouge_l(ref, hyp),
+    }
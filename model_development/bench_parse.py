@@ -0,0 +1,136 @@
+# bench_parse.py
+# Benchmark parsing HTML artikel Tempo secara offline dari fixture tersimpan.
+#
+#   python scraptempo.py --save-html fixtures/ ...      # kumpulkan fixture saat crawl
+#   python bench_parse.py --fixtures fixtures/ --workers 0,2,4
+#
+# Mengukur halaman/detik untuk setiap backend parser (html.parser, lxml) dan
+# jumlah proses parsing, memastikan semua konfigurasi menghasilkan dict yang
+# sama, dan membandingkan cleanup satu-pass (clean_node) dengan cara lama
+# (satu select() per selector).
+
+import os, json, sys, time, argparse, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+import scraptempo as st
+
+def load_fixtures(path: str) -> List[Tuple[str, str]]:
+    """(url, html) dari index.jsonl hasil --save-html, atau semua *.html di direktori."""
+    index = os.path.join(path, "index.jsonl")
+    pages = []
+    if os.path.exists(index):
+        with open(index, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    r = json.loads(line)
+                    with open(os.path.join(path, r["file"]), encoding="utf-8") as h:
+                        pages.append((r["url"], h.read()))
+    else:
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".html"):
+                with open(os.path.join(path, name), encoding="utf-8") as h:
+                    pages.append((f"https://www.tempo.co/hukum/{name[:-5]}-000000", h.read()))
+    return pages
+
+def available_parsers() -> List[str]:
+    return ["html.parser", "lxml"] if st.default_parser() == "lxml" else ["html.parser"]
+
+def _parse_one(args):
+    url, html, parser = args
+    return st.parse_article_page(url, html, True, parser)
+
+def run_config(pages, parser: str, workers: int) -> Tuple[float, List[Dict]]:
+    jobs = [(u, h, parser) for u, h in pages]
+    if workers <= 0:
+        start = time.perf_counter()
+        out = [_parse_one(j) for j in jobs]
+        return time.perf_counter() - start, out
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Pemanasan: waktu start proses tidak ikut terukur
+        list(pool.map(_parse_one, jobs[:workers]))
+        start = time.perf_counter()
+        out = list(pool.map(_parse_one, jobs, chunksize=4))
+        return time.perf_counter() - start, out
+
+# ---- implementasi lama, hanya untuk pembanding ----
+def clean_node_per_selector(node):
+    for sel in st.NOISE_SELECTORS:
+        for n in node.select(sel):
+            n.decompose()
+
+def bench_pair(pages, parser: str, prepare, old, new) -> Dict:
+    """Waktu fungsi lama vs baru pada soup yang sama (parse tidak ikut diukur)."""
+    timings, same = {"old": 0.0, "new": 0.0}, True
+    for _, html in pages:
+        results = {}
+        for name, fn in (("old", old), ("new", new)):
+            soup = BeautifulSoup(html, parser)
+            target = prepare(soup)
+            start = time.perf_counter()
+            value = fn(target)
+            timings[name] += time.perf_counter() - start
+            results[name] = value if value is not None else str(target)
+        same = same and results["old"] == results["new"]
+    return {
+        "old_ms_per_page": round(timings["old"] * 1000 / len(pages), 3),
+        "new_ms_per_page": round(timings["new"] * 1000 / len(pages), 3),
+        "speedup": round(timings["old"] / timings["new"], 2) if timings["new"] else None,
+        "identical": same,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing HTML artikel dari fixture tersimpan.")
+    parser.add_argument("--fixtures", required=True, help="Direktori hasil scraptempo.py --save-html")
+    parser.add_argument("--workers", default="0,2,4", help="Jumlah proses parsing dipisah koma (0 = tanpa pool)")
+    parser.add_argument("--parsers", default=None, help="Backend dipisah koma (default: semua yang terpasang)")
+    parser.add_argument("--strict", action="store_true", help="Exit code 1 jika ada konfigurasi dengan hasil berbeda")
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures)
+    if not pages:
+        parser.error(f"Tidak ada fixture HTML di {args.fixtures}")
+    parsers = args.parsers.split(",") if args.parsers else available_parsers()
+    workers = [int(w) for w in args.workers.split(",") if w.strip()]
+    mb = sum(len(h.encode("utf-8")) for _, h in pages) / 1e6
+
+    configs, reference, mismatches = [], None, 0
+    for p in parsers:
+        for w in workers:
+            seconds, out = run_config(pages, p, w)
+            if reference is None:
+                reference = out
+            diff = sum(1 for a, b in zip(reference, out) if a != b)
+            mismatches += diff
+            configs.append({
+                "parser": p,
+                "workers": w,
+                "seconds": round(seconds, 3),
+                "pages_per_second": round(len(pages) / seconds, 1),
+                "mb_per_second": round(mb / seconds, 2),
+                "pages_different_from_first": diff,
+            })
+
+    base = configs[0]["seconds"]
+    for c in configs:
+        c["speedup"] = round(base / c["seconds"], 2)
+
+    report = {
+        "fixtures": len(pages),
+        "megabytes": round(mb, 2),
+        "cpu_count": os.cpu_count(),
+        "configs": configs,
+        "clean_node": bench_pair(
+            pages, parsers[0],
+            lambda soup: soup.select_one("#content-wrapper") or soup,
+            clean_node_per_selector, st.clean_node,
+        ),
+    }
+    print(json.dumps(report, indent=2))
+    if args.strict and mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
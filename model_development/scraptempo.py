@@ -1,14 +1,21 @@
 # tempo_hukum_scraper_nolimit.py
 # Scrape Tempo.co kanal Hukum, tanpa batas jumlah artikel/halaman listing.
 # Fitur: follow multi-page artikel, content bersih, filter 3 tahun terakhir (opsional).
-
-import re, csv, time, sys, argparse, logging
+# Mode konkuren (--concurrency N): thread pool + rate limit global (token bucket)
+# + batas koneksi per host, menggantikan sleep DELAY setelah setiap request.
+# State crawl (SQLite) + CSV append-only: rerun hanya mengambil artikel baru.
+# Parsing HTML bisa dipindah ke process pool (--parse-workers), parser lxml bila ada.
+
+import re, csv, os, json, time, sys, sqlite3, argparse, logging, threading, hashlib, multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta, timezone
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 from urllib.parse import urlparse, urlunparse, parse_qs, urlencode, urljoin
-from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
 # =======================
@@ -27,6 +34,11 @@ DELAY = 0.30
 MAX_RETRIES = 3
 BACKOFF = 1.25
 
+# Mode konkuren: default rate = 1/DELAY, jadi beban ke server sama dengan mode serial
+CONCURRENCY = 1
+RATE_PER_SEC = 1 / DELAY
+PER_HOST_CONCURRENCY = 4
+
 ALLOWED_HOSTS = {"tempo.co", "www.tempo.co"}
 
 # default kanal = hukum; regex akan dioverride jika --rubric diubah
@@ -50,19 +62,98 @@ DATE_RE = re.compile(
     re.I
 )
 
+# =======================
+# Rate limit (mode konkuren)
+# =======================
+class TokenBucket:
+    """Rate limit global: rata-rata `rate` request/detik, burst maksimal `burst`."""
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimiter:
+    """Token bucket global + semaphore per host; dipakai setiap percobaan http_get."""
+    def __init__(self, rate: float = RATE_PER_SEC, per_host: int = PER_HOST_CONCURRENCY):
+        self.bucket = TokenBucket(rate) if rate > 0 else None
+        self.per_host = max(1, per_host)
+        self.hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str):
+        host = urlparse(url).netloc.lower()
+        with self.lock:
+            sem = self.hosts.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with sem:
+            if self.bucket:
+                self.bucket.acquire()
+            yield
+
+# None = mode serial (sleep DELAY di antara request seperti semula)
+LIMITER: Optional[RateLimiter] = None
+
+# Backend BeautifulSoup: lxml jauh lebih cepat, html.parser jika lxml tidak terpasang
+def default_parser() -> str:
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+PARSER = default_parser()
+
+# Direktori untuk menyimpan HTML artikel mentah (fixture bench_parse.py); None = tidak disimpan
+SAVE_HTML_DIR: Optional[str] = None
+_save_lock = threading.Lock()
+
+def save_html(url: str, html: str):
+    name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".html"
+    with open(os.path.join(SAVE_HTML_DIR, name), "w", encoding="utf-8") as f:
+        f.write(html)
+    with _save_lock, open(os.path.join(SAVE_HTML_DIR, "index.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"url": url, "file": name}) + "\n")
+
+def polite_sleep():
+    # Di mode konkuren jeda diatur LIMITER, bukan sleep tetap
+    if LIMITER is None:
+        time.sleep(DELAY)
+
 # =======================
 # Utilitas HTTP
 # =======================
-def new_session():
+def new_session(pool_size: int = 10):
     s = requests.Session()
     s.headers.update(HEADERS)
+    # Pool koneksi keep-alive cukup untuk semua thread fetcher
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, pool_size))
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
     return s
 
 def http_get(session: requests.Session, url: str, timeout=REQ_TIMEOUT) -> requests.Response:
     last_err: Optional[BaseException] = None
     for att in range(1, MAX_RETRIES + 1):
         try:
-            r = session.get(url, timeout=timeout, allow_redirects=True)
+            if LIMITER is not None:
+                with LIMITER.slot(url):
+                    r = session.get(url, timeout=timeout, allow_redirects=True)
+            else:
+                r = session.get(url, timeout=timeout, allow_redirects=True)
             if r.status_code == 403:
                 ua = session.headers.get("User-Agent", "")
                 # safe replace: kalau pattern tidak cocok, tetap aman
@@ -79,7 +170,7 @@ def http_get(session: requests.Session, url: str, timeout=REQ_TIMEOUT) -> reques
 
 def get_soup(session: requests.Session, url: str) -> BeautifulSoup:
     r = http_get(session, url, timeout=REQ_TIMEOUT)
-    return BeautifulSoup(r.text, "html.parser")
+    return BeautifulSoup(r.text, PARSER)
 
 def build_page_url(base_url: str, page_num: int) -> str:
     if page_num == 1:
@@ -126,15 +217,19 @@ def parse_tempo_date_to_aware_iso(s: str) -> Tuple[Optional[str], Optional[datet
 # =======================
 # Cleaners & pickers
 # =======================
+NOISE_SELECTORS = [
+    "script","style","aside","nav","iframe","noscript","form",
+    ".ads",".iklan",".share",".baca-juga",".related",".remp-banner",
+    ".disco-widget",".podcast",".podcast-rekomendasi",".paywall-cta",
+    "#feature_image",".caption",".breadcrumb",".sticky",
+]
+NOISE_SELECTOR = ", ".join(NOISE_SELECTORS)
+
 def clean_node(node):
     if not node: return
-    for sel in [
-        "script","style","aside","nav","iframe","noscript","form",
-        ".ads",".iklan",".share",".baca-juga",".related",".remp-banner",
-        ".disco-widget",".podcast",".podcast-rekomendasi",".paywall-cta",
-        "#feature_image",".caption",".breadcrumb",".sticky",
-    ]:
-        for n in node.select(sel):
+    # Satu traversal untuk semua selector; noise di dalam noise yang sudah dibuang dilewati
+    for n in node.select(NOISE_SELECTOR):
+        if not n.decomposed:
             n.decompose()
 
 def extract_released_tempo(header_scope, soup):
@@ -264,7 +359,34 @@ def find_next_article_page_url(current_url: str, soup: BeautifulSoup) -> Optiona
                 return u
     return None
 
-def scrape_article_all_pages(session: requests.Session, first_url: str) -> Tuple[str, List[str], str, str, List[str]]:
+def parse_article_page(url: str, html: str, first_page: bool, parser: str = "html.parser") -> Dict:
+    """
+    Parse satu halaman artikel tanpa I/O (bisa dijalankan di process pool).
+    Metadata (title, tanggal, highlight, tag) hanya diambil di halaman pertama.
+    """
+    soup = BeautifulSoup(html, parser)
+    page = {"title": "", "released_raw": "", "highlight": "", "tags": []}
+
+    main = soup.select_one("main") or soup
+    header_scope = None
+    for cand in [main, soup]:
+        hdr = cand.find("h1")
+        if hdr:
+            header_scope = hdr.parent if hdr.parent else cand
+            break
+
+    if first_page:
+        page["title"] = tx(soup.select_one("h1")) or ""
+        page["released_raw"] = extract_released_tempo(header_scope, soup) or ""
+        page["highlight"] = pick_highlight_tempo(soup, header_scope) or ""
+        page["tags"] = extract_tags_tempo(soup)  # <<–– ambil tag di halaman pertama
+
+    page["paras"] = extract_content_wrappers(soup)
+    page["next_url"] = find_next_article_page_url(url, soup)
+    return page
+
+def scrape_article_all_pages(session: requests.Session, first_url: str,
+                             parse_pool: Optional[Executor] = None) -> Tuple[str, List[str], str, str, List[str]]:
     visited = set()
     url = first_url
     all_paras: List[str] = []
@@ -276,31 +398,30 @@ def scrape_article_all_pages(session: requests.Session, first_url: str) -> Tuple
 
     while url and url not in visited:
         visited.add(url)
-        soup = get_soup(session, url)
+        html = http_get(session, url, timeout=REQ_TIMEOUT).text
         page_idx += 1
+        if SAVE_HTML_DIR:
+            save_html(url, html)
 
-        main = soup.select_one("main") or soup
-        header_scope = None
-        for cand in [main, soup]:
-            hdr = cand.find("h1")
-            if hdr:
-                header_scope = hdr.parent if hdr.parent else cand
-                break
+        # Thread fetcher menunggu hasil parse (tanpa GIL) selagi fetcher lain jalan
+        if parse_pool is not None:
+            page = parse_pool.submit(parse_article_page, url, html, page_idx == 1, PARSER).result()
+        else:
+            page = parse_article_page(url, html, page_idx == 1, PARSER)
 
         if page_idx == 1:
-            title = tx(soup.select_one("h1")) or title
-            released_raw = extract_released_tempo(header_scope, soup) or released_raw
-            highlight = pick_highlight_tempo(soup, header_scope) or highlight
-            tags = extract_tags_tempo(soup)  # <<–– ambil tag di halaman pertama
+            title = page["title"] or title
+            released_raw = page["released_raw"] or released_raw
+            highlight = page["highlight"] or highlight
+            tags = page["tags"]
 
-        paras = extract_content_wrappers(soup)
-        all_paras.extend(paras)
+        all_paras.extend(page["paras"])
 
-        next_url = find_next_article_page_url(url, soup)
+        next_url = page["next_url"]
         if not next_url or next_url in visited:
             break
         url = next_url
-        time.sleep(DELAY)
+        polite_sleep()
 
     # dedup paragraf
     seen, merged = set(), []
@@ -318,13 +439,13 @@ def guard_domain(url):
     if pr.netloc.lower() not in ALLOWED_HOSTS:
         raise ValueError(f"Host tidak didukung: {pr.netloc}")
 
-def scrape_article_tempo(session: requests.Session, url: str) -> Dict:
+def scrape_article_tempo(session: requests.Session, url: str, parse_pool: Optional[Executor] = None) -> Dict:
     guard_domain(url)
     pr = urlparse(url)
     if not TEMPO_ART_RE.match(pr.path):
         raise ValueError("Bukan URL artikel kanal yang valid.")
 
-    title, paragraphs, released_raw, highlight, tags = scrape_article_all_pages(session, url)
+    title, paragraphs, released_raw, highlight, tags = scrape_article_all_pages(session, url, parse_pool)
     released_iso, _ = parse_tempo_date_to_aware_iso(released_raw)
     content = "\n\n".join(paragraphs).strip()
 
@@ -342,16 +463,37 @@ def scrape_article_tempo(session: requests.Session, url: str) -> Dict:
 # =======================
 # Discovery URL tanpa batas
 # =======================
-def collect_urls_unlimited(session: requests.Session, rubric: str) -> List[str]:
+def listing_newest_date(soup: BeautifulSoup) -> Optional[datetime]:
+    """Tanggal terbaru yang tertulis di halaman listing (None jika tidak ada)."""
+    dates = [parse_tempo_date_to_aware_iso(m.group(0))[1] for m in DATE_RE.finditer(soup.get_text(" ", strip=True))]
+    dates = [d for d in dates if d]
+    return max(dates) if dates else None
+
+def collect_urls_unlimited(session: requests.Session, rubric: str, state: Optional["CrawlState"] = None,
+                           since_utc: Optional[datetime] = None) -> List[str]:
+    """
+    Listing urut terbaru dulu. Berhenti per seed jika EMPTY_STREAK_LIMIT halaman
+    berturut-turut tanpa URL baru, atau halaman sudah lebih lama dari since_utc.
+    Dengan state: URL & halaman terakhir disimpan, jadi discovery yang terputus
+    dilanjutkan, dan rerun setelah discovery selesai berhenti begitu menemui
+    URL yang sudah dikenal.
+    """
     seeds = [
         f"https://www.tempo.co/{rubric}",
         f"https://www.tempo.co/indeks?category=rubrik&rubric_slug={rubric}",
     ]
     urls, seen = [], set()
     EMPTY_STREAK_LIMIT = 5
+    OLD_STREAK_LIMIT = 2
     for seed in seeds:
         page = 1
+        if state is not None:
+            last_page, finished = state.listing_progress(seed)
+            if not finished and last_page:
+                logging.info(f"[{rubric}] lanjut discovery {seed} dari page {last_page + 1}")
+                page = last_page + 1
         empty_streak = 0
+        old_streak = 0
         while True:
             u = build_page_url(seed, page)
             try:
@@ -374,9 +516,13 @@ def collect_urls_unlimited(session: requests.Session, rubric: str) -> List[str]:
                     continue
                 if absu not in seen:
                     seen.add(absu)
+                    if state is not None and not state.add_url(absu):
+                        continue
                     urls.append(absu)
                     found_this_page += 1
 
+            if state is not None:
+                state.save_listing(seed, page)
             logging.info(f"[{rubric}] page {page}: +{found_this_page} url")
             if found_this_page == 0:
                 empty_streak += 1
@@ -384,20 +530,170 @@ def collect_urls_unlimited(session: requests.Session, rubric: str) -> List[str]:
                 empty_streak = 0
             if empty_streak >= EMPTY_STREAK_LIMIT:
                 break
+
+            newest = listing_newest_date(soup) if since_utc else None
+            old_streak = old_streak + 1 if newest and newest < since_utc else 0
+            if old_streak >= OLD_STREAK_LIMIT:
+                logging.info(f"[{rubric}] page {page} sudah sebelum --since, discovery {seed} berhenti")
+                break
             page += 1
-            time.sleep(DELAY)
+            polite_sleep()
+        if state is not None:
+            state.finish_listing(seed)
     return urls
 
+def iter_scraped(session: requests.Session, urls: List[str], workers: int,
+                 parse_pool: Optional[Executor] = None) -> Iterator[Tuple[str, Optional[Dict], Optional[Exception]]]:
+    """(url, artikel, error) urut sesuai `urls`; artikel di-scrape paralel oleh `workers` thread."""
+    def job(u):
+        try:
+            return scrape_article_tempo(session, u, parse_pool), None
+        except Exception as e:
+            return None, e
+
+    if workers <= 1:
+        for u in urls:
+            art, err = job(u)
+            yield u, art, err
+        return
+
+    # Jendela in-flight dibatasi supaya daftar URL besar tidak jadi jutaan future
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape") as pool:
+        pending = deque()
+        it = iter(urls)
+        for u in it:
+            pending.append((u, pool.submit(job, u)))
+            if len(pending) >= workers * 4:
+                break
+        while pending:
+            u, fut = pending.popleft()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append((nxt, pool.submit(job, nxt)))
+            art, err = fut.result()
+            yield u, art, err
+
 # =======================
-# CSV saver
+# CSV saver & crawl state
 # =======================
-def save_rows_to_csv(rows: List[Dict], csv_path: str):
-    fields = ["source","url","released_iso","released_raw","title","highlight","content","tag"]
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fields)
-        w.writeheader()
-        for d in rows:
-            w.writerow({k: d.get(k, "") for k in fields})
+CSV_FIELDS = ["source","url","released_iso","released_raw","title","highlight","content","tag"]
+
+class CsvAppender:
+    """CSV append-only: satu baris ditulis & di-flush per artikel, header hanya untuk file baru."""
+    def __init__(self, csv_path: str):
+        new = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+        self.f = open(csv_path, "a", newline="", encoding="utf-8")
+        self.w = csv.DictWriter(self.f, fieldnames=CSV_FIELDS)
+        if new:
+            self.w.writeheader()
+
+    def write(self, d: Dict):
+        self.w.writerow({k: d.get(k, "") for k in CSV_FIELDS})
+        self.f.flush()
+
+    def sync(self):
+        os.fsync(self.f.fileno())
+
+    def close(self):
+        self.f.close()
+
+def csv_rows(csv_path: str) -> Iterator[Dict]:
+    if not os.path.exists(csv_path):
+        return
+    csv.field_size_limit(sys.maxsize)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("url"):
+                yield row
+
+def csv_urls(csv_path: str) -> Iterator[str]:
+    for row in csv_rows(csv_path):
+        yield row["url"]
+
+def open_dedup_index(path: str, threshold: float):
+    """
+    Index near-duplicate (MinHash/LSH) dari app/services/dedup_service,
+    dipakai bersama API supaya shingle dihitung dari teks hasil
+    preprocess_input_text yang sama. Root repo ditambahkan ke sys.path.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    from app.services.dedup_service import NearDuplicateIndex
+    from app.services.summarizer_service import preprocess_input_text
+    return NearDuplicateIndex(path, threshold=threshold), preprocess_input_text
+
+class CrawlState:
+    """
+    State crawl persisten (SQLite): URL yang sudah ditemukan + status per URL
+    (new / kept / skipped / duplicate / failed) dan halaman listing terakhir per seed.
+    """
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            " url TEXT PRIMARY KEY, status TEXT NOT NULL DEFAULT 'new', released_iso TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0, error TEXT, updated_at REAL);"
+            "CREATE TABLE IF NOT EXISTS listing ("
+            " seed TEXT PRIMARY KEY, last_page INTEGER NOT NULL DEFAULT 0, finished INTEGER NOT NULL DEFAULT 0);"
+        )
+        self.db.commit()
+
+    def import_csv(self, csv_path: str) -> int:
+        """URL yang sudah ada di CSV lama dianggap kept (CSV dari versi tanpa state)."""
+        cur = self.db.executemany(
+            "INSERT OR IGNORE INTO urls (url, status, updated_at) VALUES (?, 'kept', ?)",
+            ((u, time.time()) for u in csv_urls(csv_path))
+        )
+        self.db.commit()
+        return cur.rowcount
+
+    def add_url(self, url: str) -> bool:
+        """True jika URL belum pernah ditemukan."""
+        cur = self.db.execute("INSERT OR IGNORE INTO urls (url, updated_at) VALUES (?, ?)", (url, time.time()))
+        return cur.rowcount > 0
+
+    def listing_progress(self, seed: str) -> Tuple[int, bool]:
+        row = self.db.execute("SELECT last_page, finished FROM listing WHERE seed = ?", (seed,)).fetchone()
+        return (row[0], bool(row[1])) if row else (0, False)
+
+    def save_listing(self, seed: str, page: int):
+        self.db.execute(
+            "INSERT INTO listing (seed, last_page, finished) VALUES (?, ?, 0)"
+            " ON CONFLICT(seed) DO UPDATE SET last_page = excluded.last_page, finished = 0", (seed, page)
+        )
+        self.db.commit()
+
+    def finish_listing(self, seed: str):
+        # Rerun berikutnya mulai lagi dari page 1 (artikel baru ada di depan)
+        self.db.execute("UPDATE listing SET finished = 1, last_page = 0 WHERE seed = ?", (seed,))
+        self.db.commit()
+
+    def pending(self, in_range=None) -> List[str]:
+        """
+        URL yang perlu di-scrape: baru, gagal sebelumnya, atau dulu di luar
+        rentang tanggal tapi kini masuk (tanpa filter tanggal: semua yang di-skip).
+        """
+        rows = self.db.execute(
+            "SELECT url, status, released_iso FROM urls WHERE status IN ('new', 'failed', 'skipped') ORDER BY rowid"
+        ).fetchall()
+        out = []
+        for url, status, iso in rows:
+            if status == "skipped" and in_range is not None and (not iso or not in_range(iso)):
+                continue
+            out.append(url)
+        return out
+
+    def mark(self, url: str, status: str, released_iso: Optional[str] = None, error: Optional[str] = None):
+        self.db.execute(
+            "UPDATE urls SET status = ?, released_iso = COALESCE(?, released_iso), error = ?,"
+            " attempts = attempts + 1, updated_at = ? WHERE url = ?",
+            (status, released_iso, error, time.time(), url)
+        )
+        self.db.commit()
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM urls GROUP BY status").fetchall())
 
 # =======================
 # Main
@@ -409,7 +705,18 @@ def main():
     parser.add_argument("--since", default=None, help="YYYY-MM-DD awal (default: 3 tahun sebelum hari ini, Asia/Makassar)")
     parser.add_argument("--until", default=None, help="YYYY-MM-DD akhir (default: hari ini, Asia/Makassar)")
     parser.add_argument("--no-date-filter", action="store_true", help="Nonaktifkan penyaringan tanggal (ambil semua)")
-    parser.add_argument("--checkpoint-every", type=int, default=300, help="Simpan CSV setiap N artikel")
+    parser.add_argument("--checkpoint-every", type=int, default=300, help="fsync CSV & log progres setiap N artikel")
+    parser.add_argument("--state", default=None, help="File state crawl SQLite (default: <out>.state.sqlite)")
+    parser.add_argument("--parser", default="auto", choices=["auto", "lxml", "html.parser"], help="Backend BeautifulSoup (auto = lxml bila terpasang)")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Proses untuk parsing HTML (0 = parse di thread fetcher)")
+    parser.add_argument("--save-html", default=None, help="Simpan HTML artikel mentah ke direktori ini (fixture bench_parse.py)")
+    parser.add_argument("--dedup", action="store_true", help="Deteksi artikel hampir identik (MinHash/LSH) dengan artikel yang sudah tersimpan")
+    parser.add_argument("--dedup-index", default=None, help="File index near-duplicate SQLite (default: <out>.dedup.sqlite)")
+    parser.add_argument("--dedup-threshold", type=float, default=0.9, help="Kemiripan Jaccard minimal untuk dianggap duplikat")
+    parser.add_argument("--dedup-action", default="skip", choices=["skip", "flag"], help="skip = tidak ditulis ke CSV; flag = tetap ditulis, dicatat di state & log")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Jumlah fetcher paralel (1 = serial seperti semula)")
+    parser.add_argument("--rate", type=float, default=RATE_PER_SEC, help="Maks request/detik total di mode konkuren (0 = tanpa batas)")
+    parser.add_argument("--per-host", type=int, default=PER_HOST_CONCURRENCY, help="Maks request bersamaan per host di mode konkuren")
     args = parser.parse_args()
 
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", datefmt="%H:%M:%S")
@@ -429,52 +736,99 @@ def main():
     global TEMPO_ART_RE
     TEMPO_ART_RE = re.compile(rf"^/{re.escape(rubric)}/[^/?#]+-\d{{6,}}$", re.I)
 
-    session = new_session()
+    global LIMITER, PARSER, SAVE_HTML_DIR
+    if args.parser != "auto":
+        PARSER = args.parser
+    if args.save_html:
+        os.makedirs(args.save_html, exist_ok=True)
+        SAVE_HTML_DIR = args.save_html
+    if args.concurrency > 1:
+        LIMITER = RateLimiter(args.rate, args.per_host)
+        logging.info(f"Mode konkuren: {args.concurrency} fetcher, {args.rate:g} req/detik, {args.per_host} per host")
+    session = new_session(pool_size=args.concurrency)
+
+    since_utc = since_local.astimezone(timezone.utc) if since_local else None
+    until_utc = until_local.astimezone(timezone.utc) if until_local else None
+
+    def in_range(iso: str) -> bool:
+        utc_dt = datetime.fromisoformat(iso.replace("Z", "+00:00"))
+        return since_utc <= utc_dt <= until_utc
+
+    state = CrawlState(args.state or f"{args.out}.state.sqlite")
+    imported = state.import_csv(args.out)
+    if imported > 0:
+        logging.info(f"{imported} URL dari {args.out} yang sudah ada ditandai selesai")
+
+    dedup = preprocess = None
+    if args.dedup:
+        dedup, preprocess = open_dedup_index(args.dedup_index or f"{args.out}.dedup.sqlite", args.dedup_threshold)
+        if len(dedup) == 0:
+            # Index baru: artikel yang sudah ada di CSV jadi pembanding
+            indexed = dedup.add_many(
+                (row["url"], dedup.signature(preprocess(row.get("content", ""))), row.get("title"))
+                for row in csv_rows(args.out)
+            )
+            if indexed > 0:
+                logging.info(f"{indexed} artikel dari {args.out} dimasukkan ke index near-duplicate")
 
     logging.info(f"[{rubric}] mulai discovery tanpa batas halaman…")
-    cand_urls = collect_urls_unlimited(session, rubric)
-    logging.info(f"Total kandidat URL: {len(cand_urls)}")
+    new_urls = collect_urls_unlimited(session, rubric, state=state, since_utc=since_utc)
+    cand_urls = state.pending(None if args.no_date_filter else in_range)
+    logging.info(f"URL baru: {len(new_urls)}, perlu di-scrape: {len(cand_urls)} (state: {state.counts()})")
 
-    rows = []
+    out = CsvAppender(args.out)
     kept = 0
-    for i, u in enumerate(cand_urls, 1):
-        try:
-            art = scrape_article_tempo(session, u)
-
-            if not args.no_date_filter:
-                iso = art.get("released_iso")
-                if not iso:
-                    time.sleep(DELAY)
-                    continue
-
-                utc_dt = datetime.fromisoformat(iso.replace("Z", "+00:00"))
-
-                # Tambahan agar Pylance tahu variabel pasti bukan None
-                assert since_local is not None and until_local is not None, "since/until_local None"
-
-                since_utc = since_local.astimezone(timezone.utc)
-                until_utc = until_local.astimezone(timezone.utc)
-
-                if not (since_utc <= utc_dt <= until_utc):
-                    time.sleep(DELAY)
-                    continue
-
-            rows.append(art)
-            kept += 1
-
-            if kept % args.checkpoint_every == 0:
-                save_rows_to_csv(rows, args.out)
-                logging.info(f"Checkpoint → {args.out} (rows={len(rows)})")
-
-            logging.info(f"[keep {kept}/{i}] {u}")
-            time.sleep(DELAY)
-
-        except Exception as e:
-            logging.warning(f"  ! Gagal {u}: {e}")
-            time.sleep(DELAY)
+    # spawn, bukan fork: proses parser tidak mewarisi thread fetcher yang sedang jalan
+    parse_pool = ProcessPoolExecutor(args.parse_workers, mp_context=multiprocessing.get_context("spawn")) if args.parse_workers > 0 else None
+    try:
+        for i, (u, art, err) in enumerate(iter_scraped(session, cand_urls, args.concurrency, parse_pool), 1):
+            try:
+                if err is not None:
+                    raise err
+
+                iso = art.get("released_iso") or None
+                if not args.no_date_filter:
+                    if not iso or not in_range(iso):
+                        state.mark(u, "skipped", iso)
+                        polite_sleep()
+                        continue
+
+                note = signature = None
+                if dedup is not None:
+                    signature = dedup.signature(preprocess(art.get("content", "")))
+                    match = dedup.query(signature)
+                    if match is not None and match.key != u:
+                        note = f"near-duplicate {match.key} ({match.similarity:.2f})"
+                        logging.info(f"  ≈ {u} mirip {match.key} ({match.similarity:.2f})")
+                        if args.dedup_action == "skip":
+                            state.mark(u, "duplicate", iso, error=note)
+                            polite_sleep()
+                            continue
+
+                # Tulis dulu baru tandai kept: mati di antaranya paling buruk jadi baris ganda
+                out.write(art)
+                state.mark(u, "kept", iso, error=note)
+                if dedup is not None and note is None:
+                    dedup.add(u, signature, payload=art.get("title"))
+                kept += 1
+
+                if kept % args.checkpoint_every == 0:
+                    out.sync()
+                    logging.info(f"Checkpoint → {args.out} (+{kept} artikel baru)")
+
+                logging.info(f"[keep {kept}/{i}] {u}")
+                polite_sleep()
 
-    save_rows_to_csv(rows, args.out)
-    logging.info(f"✔ Selesai. Tersimpan {len(rows)} artikel → {args.out}")
+            except Exception as e:
+                logging.warning(f"  ! Gagal {u}: {e}")
+                state.mark(u, "failed", error=str(e))
+                polite_sleep()
+    finally:
+        out.close()
+        if parse_pool is not None:
+            parse_pool.shutdown()
+
+    logging.info(f"✔ Selesai. +{kept} artikel baru → {args.out} (state: {state.counts()})")
     logging.info("Catatan: untuk rubrik lain, jalankan --rubric=<nama> (mis. politik, nasional, metro, bisnis, dunia).")
 
 if __name__ == "__main__":